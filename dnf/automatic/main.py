@@ -235,8 +235,7 @@ class EmittersConfig(Config):
 
 def gpgsigcheck(base, pkgs):
     ok = True
-    for po in pkgs:
-        result, errmsg = base.package_signature_check(po)
+    for result, errmsg in base.packages_signature_check(pkgs):
         if result != 0:
             ok = False
             logger.critical(errmsg)
@@ -25,6 +25,7 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import argparse
+import concurrent.futures
 import dnf
 import libdnf.transaction
 
@@ -43,6 +44,7 @@ import dnf.callback
 import dnf.comps
 import dnf.conf
 import dnf.conf.read
+import dnf.const
 import dnf.crypto
 import dnf.dnssec
 import dnf.drpm
@@ -57,6 +59,7 @@ try:
     WITH_MODULES = True
 except ImportError:
     WITH_MODULES = False
+import dnf.package
 import dnf.persistor
 import dnf.plugin
 import dnf.query
@@ -118,6 +121,7 @@ class Base(object):
         self._update_security_options = {}
         self._allow_erasing = False
         self._repo_set_imported_gpg_keys = set()
+        self._pipeline_sigresults = {}
         self.output = None
 
     def __enter__(self):
@@ -137,6 +141,28 @@ class Base(object):
         else:
             self._tempfiles.update(files)
 
+    def _load_repos_metadata(self, repos):
+        """Load metadata of the repos concurrently in a bounded pool of workers.
+
+        Returns a dict mapping repo id to the RepoError raised while loading its metadata.
+        The repos are loaded in the caller's thread if conf.max_parallel_metadata is 1.
+        """
+        workers = min(self.conf.max_parallel_metadata, len(repos))
+        if workers <= 1:
+            return {}
+        errors = {}
+
+        def load(repo):
+            try:
+                repo.load()
+            except dnf.exceptions.RepoError as e:
+                errors[repo.id] = e
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            # consume the results to propagate unexpected exceptions
+            list(executor.map(load, repos))
+        return errors
+
     def _add_repo_to_sack(self, repo):
         repo.load()
         mdload_flags = dict(load_presto=repo.deltarpm,
@@ -174,11 +200,36 @@ class Base(object):
             logger.warning(
                 dnf.module.module_base.format_modular_solver_errors(solver_errors[0]))
 
-    def _setup_excludes_includes(self, only_main=False):
-        disabled = set(self.conf.disable_excludes)
-        if 'all' in disabled and WITH_MODULES:
-            self._setup_modular_excludes()
-            return
+    def _excludes_includes_configured(self):
+        if len(self.conf.excludepkgs) > 0 or len(self.conf.includepkgs) > 0:
+            return True
+        return any(len(r.excludepkgs) > 0 or len(r.includepkgs) > 0
+                   for r in self.repos.iter_enabled())
+
+    def _sack_snapshot_key(self):
+        """Return the key of the sack snapshot, it covers everything the evaluation of
+        the excludes and includes depends on."""
+        conf = self.conf
+        repos = [[r.id, r.get_metadata_path('primary'), r._repo.getRevision(),
+                  sorted(r.excludepkgs), sorted(r.includepkgs)]
+                 for r in self.repos.iter_enabled()]
+        return {
+            'version': dnf.const.VERSION,
+            'arch': conf.substitutions['arch'],
+            'rpmdb': self._ts.dbCookie(),
+            'solvables': len(self._sack),
+            'repos': repos,
+            'optional_metadata_types': sorted(conf.optional_metadata_types),
+            'disable_excludes': sorted(conf.disable_excludes),
+            'excludepkgs': sorted(conf.excludepkgs),
+            'includepkgs': sorted(conf.includepkgs),
+        }
+
+    def _eval_excludes_includes(self, disabled, only_main):
+        """Return a list of (query, repoid) includes and a list of exclude queries.
+
+        The repoid is None for the includes of the main configuration.
+        """
         repo_includes = []
         repo_excludes = []
         # first evaluate repo specific includes/excludes
@@ -201,10 +252,12 @@ class Base(object):
                         self.sack, with_nevra=True, with_provides=False, with_filenames=False))
                 excl_query.filterm(reponame=r.id)
                 if excl_query:
-                    repo_excludes.append((excl_query, r.id))
+                    repo_excludes.append(excl_query)
 
         # then main (global) includes/excludes because they can mask
         # repo specific settings
+        includes = []
+        excludes = []
         if 'main' not in disabled:
             include_query = self.sack.query().filterm(empty=True)
             if len(self.conf.includepkgs) > 0:
@@ -218,23 +271,58 @@ class Base(object):
                 exclude_query = exclude_query.union(subj.get_best_query(
                     self.sack, with_nevra=True, with_provides=False, with_filenames=False))
             if len(self.conf.includepkgs) > 0:
-                self.sack.add_includes(include_query)
-                self.sack.set_use_includes(True)
+                includes.append((include_query, None))
             if exclude_query:
-                self.sack.add_excludes(exclude_query)
+                excludes.append(exclude_query)
+
+        return includes + repo_includes, excludes + repo_excludes
+
+    def _setup_excludes_includes(self, only_main=False):
+        disabled = set(self.conf.disable_excludes)
+        if 'all' in disabled and WITH_MODULES:
+            self._setup_modular_excludes()
+            return
 
-        if repo_includes:
-            for query, repoid in repo_includes:
-                self.sack.add_includes(query)
+        # The evaluated excludes and includes are kept as a snapshot of solvable ids in the
+        # cachedir. The ids are stable as long as the snapshot key does not change.
+        includes = None
+        persistor = None
+        if not only_main and self._excludes_includes_configured():
+            persistor = dnf.persistor.SackSnapshotPersistor(self.conf.cachedir)
+            snapshot_key = self._sack_snapshot_key()
+            snapshot = persistor.load(snapshot_key)
+            if snapshot is not None:
+                includes = [(self._query_from_pkg_ids(ids), repoid)
+                            for repoid, ids in snapshot['includes']]
+                excludes = [self._query_from_pkg_ids(snapshot['excludes'])]
+        if includes is None:
+            includes, excludes = self._eval_excludes_includes(disabled, only_main)
+            if persistor is not None:
+                persistor.save(snapshot_key, {
+                    'includes': [[repoid, [hash(pkg) for pkg in query]]
+                                 for query, repoid in includes],
+                    'excludes': [hash(pkg) for query in excludes for pkg in query],
+                })
+
+        for query, repoid in includes:
+            self.sack.add_includes(query)
+            if repoid is None:
+                self.sack.set_use_includes(True)
+            else:
                 self.sack.set_use_includes(True, repoid)
 
-        if repo_excludes:
-            for query, repoid in repo_excludes:
+        for query in excludes:
+            if query:
                 self.sack.add_excludes(query)
 
         if not only_main and WITH_MODULES:
             self._setup_modular_excludes()
 
+    def _query_from_pkg_ids(self, pkg_ids):
+        # hawkey packages hash to their solvable id
+        pkgs = [dnf.package.Package((self.sack, pkg_id), self) for pkg_id in pkg_ids]
+        return self.sack.query().filterm(pkg=pkgs)
+
     def _store_persistent_data(self):
         if self._repo_persistor and not self.conf.cacheonly:
             expired = [r.id for r in self.repos.iter_enabled()
@@ -379,6 +467,25 @@ class Base(object):
         logger.info(_('Metadata cache created.'))
         return True
 
+    def _load_system_repo(self):
+        """Load the installed packages into the sack.
+
+        @System.solv in cachedir is reused only if it was built from the rpmdb with the
+        current cookie. libdnf validates the file by the stat of the rpmdb files only, which
+        is not reliable in install-remove loops.
+        """
+        dbpath = os.path.join(self.conf.installroot, rpm.expandMacro('%_dbpath').lstrip('/'))
+        if not os.path.isdir(dbpath):
+            # there is no rpmdb yet, let hawkey report it
+            self._sack.load_system_repo(build_cache=False)
+            return
+        persistor = dnf.persistor.RpmdbCookiePersistor(self.conf.cachedir)
+        cookie = self._ts.dbCookie()
+        if not cookie or persistor.get_cookie() != cookie:
+            misc.unlink_f(os.path.join(self.conf.cachedir, hawkey.SYSTEM_REPO_NAME + '.solv'))
+            persistor.save(cookie)
+        self._sack.load_system_repo(build_cache=bool(cookie))
+
     def fill_sack(self, load_system_repo=True, load_available_repos=True):
         # :api
         """Prepare the Sack and the Goal objects. """
@@ -389,9 +496,7 @@ class Base(object):
         with lock:
             if load_system_repo is not False:
                 try:
-                    # FIXME: If build_cache=True, @System.solv is incorrectly updated in install-
-                    # remove loops
-                    self._sack.load_system_repo(build_cache=False)
+                    self._load_system_repo()
                 except IOError:
                     if load_system_repo != 'auto':
                         raise
@@ -401,9 +506,14 @@ class Base(object):
                 age = time.time()
                 # Iterate over installed GPG keys and check their validity using DNSSEC
                 if self.conf.gpgkey_dns_verification:
-                    dnf.dnssec.RpmImportedKeys.check_imported_keys_validity()
-                for r in self.repos.iter_enabled():
+                    dnf.dnssec.RpmImportedKeys.check_imported_keys_validity(
+                        self.conf.cachedir)
+                enabled_repos = list(self.repos.iter_enabled())
+                load_errors = self._load_repos_metadata(enabled_repos)
+                for r in enabled_repos:
                     try:
+                        if r.id in load_errors:
+                            raise load_errors[r.id]
                         self._add_repo_to_sack(r)
                         if r._repo.getTimestamp() > mts:
                             mts = r._repo.getTimestamp()
@@ -454,9 +564,7 @@ class Base(object):
         with lock:
             if load_system_repo is not False:
                 try:
-                    # FIXME: If build_cache=True, @System.solv is incorrectly updated in install-
-                    # remove loops
-                    self._sack.load_system_repo(build_cache=False)
+                    self._load_system_repo()
                 except IOError:
                     if load_system_repo != 'auto':
                         raise
@@ -464,7 +572,8 @@ class Base(object):
             error_repos = []
             # Iterate over installed GPG keys and check their validity using DNSSEC
             if self.conf.gpgkey_dns_verification:
-                dnf.dnssec.RpmImportedKeys.check_imported_keys_validity()
+                dnf.dnssec.RpmImportedKeys.check_imported_keys_validity(
+                    self.conf.cachedir)
             for repo in self.repos.iter_enabled():
                 try:
                     repo._repo.loadCache(throwExcept=True, ignoreMissing=True)
@@ -717,7 +826,7 @@ class Base(object):
                 temp_file.close()
 
         if arch_filter:
-            self._comps._i.arch_filter(
+            self._comps._arch_filter(
                 [self._conf.substitutions['basearch']])
         timer()
         return self._comps
@@ -727,9 +836,18 @@ class Base(object):
            history information. """
         if self._history is None:
             releasever = self.conf.releasever
-            self._history = SwdbInterface(self.conf.persistdir, releasever=releasever)
+            self._history = SwdbInterface(self.conf.persistdir, releasever=releasever,
+                                          installed_keys=self._installed_keys)
         return self._history
 
+    def _installed_keys(self):
+        """Return the (name, arch) pairs of the installed packages, None before
+        the sack is set up."""
+        if self._sack is None:
+            return None
+        return {(pkg.name, pkg.arch)
+                for pkg in self._sack.query(flags=hawkey.IGNORE_EXCLUDES).installed()}
+
     history = property(fget=lambda self: self._getHistory(),
                        fset=lambda self, value: setattr(
                            self, "_history", value),
@@ -1203,12 +1321,14 @@ class Base(object):
         # mark group packages that are installed on the system as installed in the db
         q = rpmdb_sack.query().installed()
         names = set([i.name for i in q])
+        changed = []
         for ti in self.history.group:
             g = ti.getCompsGroupItem()
             for p in g.getPackages():
-                if p.getName() in names:
+                if p.getName() in names and not p.getInstalled():
                     p.setInstalled(True)
-                    p.save()
+                    changed.append(p)
+        self.history._save_group_packages(changed)
 
         # TODO: installed groups in environments
 
@@ -1225,7 +1345,8 @@ class Base(object):
         timer()
         self._trans_success = True
 
-    def _download_remote_payloads(self, payloads, drpm, progress, callback_total, fail_fast=True):
+    def _download_remote_payloads(self, payloads, drpm, progress, callback_total, fail_fast=True,
+                                  pipeline=None):
         lock = dnf.lock.build_download_lock(self.conf.cachedir, self.conf.exit_on_lock)
         with lock:
             beg_download = time.time()
@@ -1237,7 +1358,7 @@ class Base(object):
                 progress.start(len(payloads), est_remote_size, total_drpms=total_drpm)
             else:
                 progress.start(len(payloads), est_remote_size)
-            errors = dnf.repo._download_payloads(payloads, drpm, fail_fast)
+            errors = dnf.repo._download_payloads(payloads, drpm, fail_fast, pipeline)
 
             if errors._irrecoverable():
                 raise dnf.exceptions.DownloadError(errors._irrecoverable())
@@ -1263,7 +1384,7 @@ class Base(object):
                 est_remote_size = sum(pload.download_size
                                       for pload in payloads)
                 progress.start(len(payloads), est_remote_size)
-                errors = dnf.repo._download_payloads(payloads, drpm, fail_fast)
+                errors = dnf.repo._download_payloads(payloads, drpm, fail_fast, pipeline)
 
                 if errors._irrecoverable():
                     raise dnf.exceptions.DownloadError(errors._irrecoverable())
@@ -1305,13 +1426,31 @@ class Base(object):
         if remote_pkgs:
             if progress is None:
                 progress = dnf.callback.NullDownloadProgress()
+            drpm_stats = dnf.persistor.DeltaRpmStatsPersistor(self.conf.cachedir)
             drpm = dnf.drpm.DeltaInfo(self.sack.query().installed(),
-                                      progress, self.conf.deltarpm_percentage)
+                                      progress, self.conf.deltarpm_percentage,
+                                      self.conf.deltarpm_jobs,
+                                      dnf.drpm.DeltaCostModel(*drpm_stats.load()))
             self._add_tempfiles([pkg.localPkg() for pkg in remote_pkgs])
             payloads = [dnf.repo._pkg2payload(pkg, progress, drpm.delta_factory,
                                               dnf.repo.RPMPayload)
                         for pkg in remote_pkgs]
-            self._download_remote_payloads(payloads, drpm, progress, callback_total)
+            pipeline = None
+            if self.conf.download_pipeline:
+                ts = dnf.rpm.transaction.initReadOnlyTransaction(self.conf.installroot)
+                pipeline = dnf.repo._PackagePipeline(
+                    functools.partial(self._process_downloaded_pkg, ts))
+            try:
+                self._download_remote_payloads(payloads, drpm, progress, callback_total,
+                                               pipeline=pipeline)
+            finally:
+                if pipeline is not None:
+                    self._pipeline_sigresults.update(
+                        (pkg, sigresult) for pkg, sigresult in pipeline.wait().items()
+                        if sigresult is not None)
+                    del ts
+            drpm._update_cost_model()
+            drpm_stats.save(drpm.cost_model.bandwidth, drpm.cost_model.rebuild_rate)
 
         if self.conf.destdir:
             for pkg in local_pkgs:
@@ -1325,6 +1464,19 @@ class Base(object):
                 except shutil.SameFileError:
                     pass
 
+    def _process_downloaded_pkg(self, ts, pkg):
+        """Check the signature and read the header of a freshly downloaded
+        package, see :class:`dnf.repo._PackagePipeline`.
+
+        The checksum was already verified by librepo. Return the result of
+        :func:`dnf.rpm.miscutils.checkSig` or None if the check is not required.
+        """
+        sigresult = None
+        if self.repos[pkg.repoid].gpgcheck:
+            sigresult = dnf.rpm.miscutils.checkSig(ts, pkg.localPkg())
+        dnf.package._read_header(pkg)
+        return sigresult
+
     def add_remote_rpms(self, path_list, strict=True, progress=None):
         # :api
         pkgs = []
@@ -1349,10 +1501,12 @@ class Base(object):
             raise IOError(_("Could not open: {}").format(' '.join(pkgs_error)))
         return pkgs
 
-    def _sig_check_pkg(self, po):
+    def _sig_check_pkg(self, po, sigresult=None):
         """Verify the GPG signature of the given package object.
 
         :param po: the package object to verify the signature of
+        :param sigresult: result of :func:`dnf.rpm.miscutils.checkSig` for
+           the package if it was already run
         :return: (result, error_string)
            where result is::
 
@@ -1370,11 +1524,12 @@ class Base(object):
             hasgpgkey = not not repo.gpgkey
 
         if check:
-            root = self.conf.installroot
-            ts = dnf.rpm.transaction.initReadOnlyTransaction(root)
-            sigresult = dnf.rpm.miscutils.checkSig(ts, po.localPkg())
+            if sigresult is None:
+                root = self.conf.installroot
+                ts = dnf.rpm.transaction.initReadOnlyTransaction(root)
+                sigresult = dnf.rpm.miscutils.checkSig(ts, po.localPkg())
+                del ts
             localfn = os.path.basename(po.localPkg())
-            del ts
             if sigresult == 0:
                 result = 0
                 msg = ''
@@ -1408,6 +1563,29 @@ class Base(object):
 
         return result, msg
 
+    def _sig_check_pkgs(self, pkgs):
+        """Verify the GPG signatures of the given package objects, running
+        the checks in parallel.
+
+        :param pkgs: a list of package objects to verify the signatures of
+        :return: a list of (result, error_string) in the order of pkgs, see
+           :meth:`_sig_check_pkg`
+        """
+        def check_required(po):
+            if po._from_cmdline:
+                return self.conf.localpkg_gpgcheck
+            return self.repos[po.repoid].gpgcheck
+
+        sigresult_by_pkg = {po: self._pipeline_sigresults.pop(po) for po in pkgs
+                            if po in self._pipeline_sigresults}
+        to_check = [po for po in pkgs if po not in sigresult_by_pkg and check_required(po)]
+        root = self.conf.installroot
+        ts = dnf.rpm.transaction.initReadOnlyTransaction(root)
+        sigresults = dnf.rpm.miscutils.checkSigs(ts, [po.localPkg() for po in to_check])
+        del ts
+        sigresult_by_pkg.update(zip(to_check, sigresults))
+        return [self._sig_check_pkg(po, sigresult_by_pkg.get(po)) for po in pkgs]
+
     def package_signature_check(self, pkg):
         # :api
         """Verify the GPG signature of the given package object.
@@ -1421,7 +1599,18 @@ class Base(object):
                     might help.
               2 = Fatal GPG verification error, give up.
         """
-        return self._sig_check_pkg(pkg)
+        return self._sig_check_pkgs([pkg])[0]
+
+    def packages_signature_check(self, pkgs):
+        # :api
+        """Verify the GPG signatures of the given package objects, running the
+        checks in parallel.
+
+        :param pkgs: a list of package objects to verify the signatures of
+        :return: a list of (result, error_string) in the order of pkgs, see
+           :meth:`package_signature_check`
+        """
+        return self._sig_check_pkgs(list(pkgs))
 
     def _clean_packages(self, packages):
         for fn in packages:
@@ -2710,6 +2899,7 @@ class Base(object):
         """
         def _verification_of_packages(pkg_list, logger_msg):
             all_packages_verified = True
+            dnf.package._verify_local_pkgs(pkg_list)
             for pkg in pkg_list:
                 pkg_successfully_verified = False
                 try:
@@ -283,8 +283,12 @@ class BaseCli(dnf.Base):
         :raises: Will raise :class:`Error` if there's a problem
         """
         error_messages = []
-        for po in pkgs:
-            result, errmsg = self._sig_check_pkg(po)
+        pkgs = list(pkgs)
+        keys_imported = False
+        for po, (result, errmsg) in zip(pkgs, self._sig_check_pkgs(pkgs)):
+            if result == 1 and keys_imported:
+                # a key imported for one of the previous packages may be the right one
+                result, errmsg = self._sig_check_pkg(po)
 
             if result == 0:
                 # Verified ok, or verify not req'd
@@ -301,6 +305,7 @@ class BaseCli(dnf.Base):
                 fn = lambda x, y, z: self.output.userconfirm()
                 try:
                     self._get_key_for_package(po, fn)
+                    keys_imported = True
                 except (dnf.exceptions.Error, ValueError) as e:
                     error_messages.append(str(e))
 
@@ -746,6 +751,12 @@ class Cli(object):
                 for repo in repos.values():
                     repo._repo.setSyncStrategy(dnf.repo.SYNC_LAZY)
 
+        if demands.available_repos and demands.available_repo_ids is not None:
+            for repo in repos.iter_enabled():
+                if repo.id not in demands.available_repo_ids:
+                    logger.debug(_('%s: not needed by the command, skipping it.'), repo.id)
+                    repo.disable()
+
         if demands.sack_activation:
             self.base.fill_sack(
                 load_system_repo='auto' if self.demands.load_system_repo else False,
@@ -299,6 +299,7 @@ class RepoPkgsCommand(Command):
         def configure(self):
             demands = self.cli.demands
             demands.available_repos = True
+            demands.available_repo_ids = [self.reponame]
             demands.sack_activation = True
 
         def run_on_repo(self):
@@ -325,6 +326,9 @@ class RepoPkgsCommand(Command):
                     self.cli._option_conflict("--obsoletes", "--" + self.opts._pkg_specs_action)
                 else:
                     self.opts.pkg_specs_action = 'obsoletes'
+            if self.opts.pkg_specs_action != 'extras':
+                # extras are the installed packages missing in all the repositories
+                demands.available_repo_ids = [self.reponame]
 
         def run_on_repo(self):
             """Execute the command with respect to given arguments *cli_args*."""
@@ -33,6 +33,11 @@ class CheckCommand(commands.Command):
     aliases = ('check',)
     summary = _('check for problems in the packagedb')
 
+    def __init__(self, cli):
+        super(CheckCommand, self).__init__(cli)
+        # providers of the dependencies of the installed packages by reldep
+        self._providers = {}
+
     @staticmethod
     def set_argparser(parser):
         parser.add_argument('--all', dest='check_types',
@@ -70,44 +75,77 @@ class CheckCommand(commands.Command):
             self.opts.check_types = set(self.opts.check_types)
         self.base.conf.disable_excludes += ["all"]
 
+    def _provided_by(self, q, reldep):
+        """Return the packages of q providing the reldep, looked up once per
+        reldep however many packages depend on it."""
+        key = str(reldep)
+        providers = self._providers.get(key)
+        if providers is None:
+            providers = q.filter(provides=[reldep]).run()
+            self._providers[key] = providers
+        return providers
+
+    def _rich_deps_unsatisfied(self, requires):
+        """Return the rich requires that cannot be satisfied by the installed
+        packages.
+
+        Rich deps can be only tested by solver. There are only @System packages
+        in the sack, so the goal is solved only when none of the deps requires
+        any additional package. All of them are tested in a single run and only
+        a failure is narrowed down to the individual deps.
+        """
+        sack = dnf.sack.rpmdb_sack(self.base)
+
+        def solved(reqs):
+            goal = dnf.goal.Goal(sack)
+            goal.protect_running_kernel = self.base.conf.protect_running_kernel
+            for require in reqs:
+                selector = dnf.selector.Selector(sack)
+                selector.set(provides=require)
+                goal.install(select=selector, optional=False)
+            return goal.run()
+
+        if solved(requires):
+            return set()
+        if len(requires) == 1:
+            return set(requires)
+        return {require for require in requires if not solved([require])}
+
     def run(self):
         output_set = set()
         q = self.base.sack.query().installed()
 
         if self.opts.check_types.intersection({'all', 'dependencies'}):
-            sack = None
+            rich_missing = {}
             for pkg in q:
                 for require in set(pkg.regular_requires) | set(set(pkg.requires_pre) - set(pkg.prereq_ignoreinst)):
                     if str(require).startswith('rpmlib'):
                         continue
-                    if not len(q.filter(provides=[require])):
+                    if not self._provided_by(q, require):
                         if str(require).startswith('('):
-                            # rich deps can be only tested by solver
-                            if sack is None:
-                                sack = dnf.sack.rpmdb_sack(self.base)
-                            selector = dnf.selector.Selector(sack)
-                            selector.set(provides=str(require))
-                            goal = dnf.goal.Goal(sack)
-                            goal.protect_running_kernel = self.base.conf.protect_running_kernel
-                            goal.install(select=selector, optional=False)
-                            solved = goal.run()
-                            # there ase only @system repo in sack, therefore solved is only in case
-                            # when rich deps doesn't require any additional package
-                            if solved:
-                                continue
+                            rich_missing.setdefault(str(require), []).append(pkg)
+                            continue
                         msg = _("{} has missing requires of {}")
                         output_set.add(msg.format(
                             self.base.output.term.bold(pkg),
                             self.base.output.term.bold(require)))
                 for conflict in pkg.conflicts:
-                    conflicted = q.filter(provides=[conflict],
-                                          name=str(conflict).split()[0])
-                    for conflict_pkg in conflicted:
+                    name = str(conflict).split()[0]
+                    for conflict_pkg in self._provided_by(q, conflict):
+                        if conflict_pkg.name != name:
+                            continue
                         msg = '{} has installed conflict "{}": {}'
                         output_set.add(msg.format(
                             self.base.output.term.bold(pkg),
                             self.base.output.term.bold(conflict),
                             self.base.output.term.bold(conflict_pkg)))
+            if rich_missing:
+                for require in self._rich_deps_unsatisfied(sorted(rich_missing)):
+                    for pkg in rich_missing[require]:
+                        msg = _("{} has missing requires of {}")
+                        output_set.add(msg.format(
+                            self.base.output.term.bold(pkg),
+                            self.base.output.term.bold(require)))
 
         if self.opts.check_types.intersection({'all', 'duplicates'}):
             installonly = self.base._get_installonly_query(q)
@@ -123,9 +161,10 @@ class CheckCommand(commands.Command):
         if self.opts.check_types.intersection({'all', 'obsoleted'}):
             for pkg in q:
                 for obsolete in pkg.obsoletes:
-                    obsoleted = q.filter(provides=[obsolete],
-                                         name=str(obsolete).split()[0])
-                    if len(obsoleted):
+                    name = str(obsolete).split()[0]
+                    obsoleted = [obsoleted_pkg for obsoleted_pkg in self._provided_by(q, obsolete)
+                                 if obsoleted_pkg.name == name]
+                    if obsoleted:
                         msg = _("{} is obsoleted by {}").format(
                             self.base.output.term.bold(obsoleted[0]),
                             self.base.output.term.bold(pkg))
@@ -134,7 +173,7 @@ class CheckCommand(commands.Command):
         if self.opts.check_types.intersection({'all', 'provides'}):
             for pkg in q:
                 for provide in pkg.provides:
-                    if pkg not in q.filter(provides=[provide]):
+                    if pkg not in self._provided_by(q, provide):
                         msg = _("{} provides {} but it cannot be found")
                         output_set.add(msg.format(
                             self.base.output.term.bold(pkg),
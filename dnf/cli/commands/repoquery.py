@@ -25,8 +25,11 @@ from dnf.cli.option_parser import OptionParser
 
 import argparse
 import datetime
+import fnmatch
+import json
 import logging
 import re
+import string
 import sys
 
 import dnf
@@ -95,6 +98,151 @@ def rpm2py_format(queryformat):
     return fmt
 
 
+class _QueryFormatRenderer(object):
+    """A queryformat compiled once and rendered for every package.
+
+    Only the tags referenced by the queryformat are fetched, each of them once
+    per package however many times it is used.
+    """
+
+    def __init__(self, queryformat):
+        self.queryformat = queryformat
+        fmt = ""
+        tags = set()
+        for literal, field, spec, conversion in string.Formatter().parse(
+                rpm2py_format(queryformat)):
+            fmt += literal.replace('{', '{{').replace('}', '}}')
+            if field is None:
+                continue
+            # fields are produced by rpm2py_format() as '0.<tag>'
+            tag = field[2:]
+            tags.add(tag)
+            fmt += '{' + tag + ('!' + conversion if conversion else '') + \
+                (':' + spec if spec else '') + '}'
+        self._fmt = fmt
+        self.tags = tuple(sorted(tags))
+
+    def render(self, pkg):
+        po = PackageWrapper(pkg)
+        return self._fmt.format_map({tag: getattr(po, tag) for tag in self.tags})
+
+
+DEP_TYPES = ('requires', 'recommends', 'enhances', 'supplements', 'suggests')
+RICH_DEP_KEYWORDS = ('and', 'or', 'if', 'else', 'with', 'without', 'unless')
+DEP_OPERATORS = ('<', '<=', '=', '>=', '>')
+
+
+def _rich_dep_tokens(dep):
+    """Split a rich dependency into parentheses and words, keeping the
+    parentheses of names like 'perl(Foo)' in the words."""
+    tokens = []
+    i = 0
+    while i < len(dep):
+        if dep[i].isspace():
+            i += 1
+        elif dep[i] in '()':
+            tokens.append(dep[i])
+            i += 1
+        else:
+            start = i
+            depth = 0
+            while i < len(dep) and not dep[i].isspace():
+                if dep[i] == '(':
+                    depth += 1
+                elif dep[i] == ')':
+                    if not depth:
+                        break
+                    depth -= 1
+                i += 1
+            tokens.append(dep[start:i])
+    return tokens
+
+
+def _rich_dep_names(tokens, pos, names, matched):
+    """Collect the names of the operands of the rich dependency starting at
+    tokens[pos] libsolv matches a reldep against and return the position
+    following it.
+
+    Those are the operands of 'and', 'or' and 'with', the consequences of
+    'if' and 'unless' and their 'else' alternative and the left operand of
+    'without', not the conditions of 'if' and 'unless' nor what follows
+    'without'.
+    """
+    pos += 1
+    keyword = None
+    while tokens[pos] != ')':
+        token = tokens[pos]
+        if token in RICH_DEP_KEYWORDS:
+            keyword = token
+            pos += 1
+            continue
+        operand_matched = matched and keyword not in ('if', 'unless', 'without')
+        if token == '(':
+            pos = _rich_dep_names(tokens, pos, names, operand_matched)
+            continue
+        if operand_matched:
+            names.append(token)
+        pos += 1
+        if tokens[pos] in DEP_OPERATORS:
+            # the operator and the version following it
+            pos += 2
+    return pos + 1
+
+
+def _dep_names(reldep):
+    """Return the names a reldep is matched by, for a rich one the names of
+    the operands libsolv matches."""
+    dep = str(reldep)
+    if not dep.startswith('('):
+        return [dep.split(' ', 1)[0]]
+    names = []
+    try:
+        _rich_dep_names(_rich_dep_tokens(dep), 0, names, True)
+    except IndexError:
+        # unbalanced parentheses, keep the names found so far
+        pass
+    return names
+
+
+class _ReverseDeps(object):
+    """Packages of a query indexed by the names of their dependencies.
+
+    The index of a dependency type is built in a single pass over the packages
+    the first time it is needed. It only pays off for the many repeated
+    lookups of --tree, which are then plain dictionary accesses, a single
+    lookup is cheaper through the sack filters.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self._indexes = {}
+
+    def _index(self, dep_type):
+        index = self._indexes.get(dep_type)
+        if index is None:
+            index = {}
+            for pkg in self.query.run():
+                for reldep in getattr(pkg, dep_type):
+                    for name in _dep_names(reldep):
+                        index.setdefault(name, set()).add(pkg)
+            self._indexes[dep_type] = index
+        return index
+
+    def dependents(self, patterns, dep_types=('requires',)):
+        """Return the set of packages with a dependency of one of `dep_types`
+        whose name matches one of the glob `patterns`."""
+        pkgs = set()
+        for dep_type in dep_types:
+            index = self._index(dep_type)
+            for pattern in patterns:
+                if dnf.util.is_glob_pattern(pattern):
+                    for name in fnmatch.filter(index, pattern):
+                        pkgs.update(index[name])
+                else:
+                    pkgs.update(index.get(pattern, ()))
+        return pkgs
+
+
 class _CommaSplitCallback(OptionParser._SplitCallback):
     SPLITTER = r'\s*,\s*'
 
@@ -109,6 +257,11 @@ class RepoQueryCommand(commands.Command):
     aliases = ('repoquery', 'rq') + tuple(nevra_forms.keys())
     summary = _('search for packages matching keyword')
 
+    _qf_renderer = None
+    _reverse_deps = None
+    _tree_children = None
+    _tree_providers = None
+
     @staticmethod
     def filter_repo_arch(opts, query):
         """Filter query by repoid and arch options"""
@@ -171,6 +324,11 @@ class RepoQueryCommand(commands.Command):
                             help=_('resolve capabilities to originating package(s)'))
         parser.add_argument("--tree", action="store_true",
                             help=_('show recursive tree for package(s)'))
+        parser.add_argument("--tree-depth", type=int, metavar='DEPTH',
+                            help=_('used with --tree, limit the tree to DEPTH levels of '
+                                   'dependencies'))
+        parser.add_argument("--tree-format", choices=['text', 'json'], default='text',
+                            help=_('used with --tree, print the tree as text or as JSON'))
         parser.add_argument('--srpm', action='store_true',
                             help=_('operate on corresponding source RPM'))
         parser.add_argument("--latest-limit", dest='latest_limit', type=int,
@@ -197,6 +355,8 @@ class RepoQueryCommand(commands.Command):
                              help=_('display format for listing packages: '
                                     '"%%{name} %%{version} ...", '
                                     'use --querytags to view full tag list'))
+        parser.add_argument('--stream', action='store_true',
+                            help=_('print each package as soon as it is found, unsorted'))
         parser.add_argument('--querytags', action='store_true',
                             help=_('show available tags to use with '
                                    '--queryformat'))
@@ -309,6 +469,9 @@ class RepoQueryCommand(commands.Command):
                       "(optionally with '--alldeps', but not with '--exactdeps'), or with "
                       "'--requires <REQ> --resolve'"))
 
+        if self.opts.tree_depth is not None and self.opts.tree_depth < 0:
+            raise dnf.cli.CliError(_("Option '--tree-depth' cannot be negative"))
+
         if self.opts.alldeps or self.opts.exactdeps:
             if not (self.opts.whatrequires or self.opts.whatdepends):
                 raise dnf.cli.CliError(
@@ -360,7 +523,10 @@ class RepoQueryCommand(commands.Command):
             elif opts.querysourcerpm:
                 return po.sourcerpm
             else:
-                return rpm2py_format(opts.queryformat).format(po)
+                if self._qf_renderer is None or \
+                        self._qf_renderer.queryformat != opts.queryformat:
+                    self._qf_renderer = _QueryFormatRenderer(opts.queryformat)
+                return self._qf_renderer.render(pkg)
         except AttributeError as e:
             # catch that the user has specified attributes
             # there don't exist on the dnf Package object.
@@ -382,40 +548,47 @@ class RepoQueryCommand(commands.Command):
     def _do_recursive_deps(self, query_in, query_select, done=None):
         done = done if done else query_select
 
-        query_required = query_in.filter(requires=query_select)
+        while query_select:
+            query_required = query_in.filter(requires=query_select)
 
-        query_select = query_required.difference(done)
-        done = query_required.union(done)
-
-        if query_select:
-            done = self._do_recursive_deps(query_in, query_select, done=done)
+            query_select = query_required.difference(done)
+            done = query_required.union(done)
 
         return done
 
+    def _dependents(self, names, query, dep_types):
+        """Return a query of the packages of `query` depending on a reldep
+        matching one of the `names` globs."""
+        if self._reverse_deps is None or self._reverse_deps.query is not query:
+            self._reverse_deps = _ReverseDeps(query)
+        pkgs = self._reverse_deps.dependents(names, dep_types)
+        return query.filter(pkg=list(pkgs))
+
     def by_all_deps(self, names, query, all_dep_types=False):
         # in case of arguments being NEVRAs, resolve them to packages
         resolved_nevras_query = self._resolve_nevras(names, query)
+        dep_types = DEP_TYPES if all_dep_types else DEP_TYPES[:1]
 
         # filter the arguments directly as reldeps
-        depquery = query.filter(requires__glob=names)
+        if self.opts.tree:
+            # the tree looks up the dependents of every node, match the plain
+            # names and globs against the names of the dependencies in the
+            # index, leave versioned and rich arguments to hawkey
+            plain = [name for name in names if len(name.split()) == 1]
+            reldeps = [name for name in names if len(name.split()) > 1]
+            depquery = self._dependents(plain, query, dep_types)
+            if reldeps:
+                for dep_type in dep_types:
+                    depquery = depquery.union(
+                        query.filter(**{dep_type + '__glob': reldeps}))
+        else:
+            depquery = query.filter(requires__glob=names)
+            for dep_type in dep_types[1:]:
+                depquery = depquery.union(query.filter(**{dep_type + '__glob': names}))
 
         # filter the resolved NEVRAs as packages
-        depquery = depquery.union(query.filter(requires=resolved_nevras_query))
-
-        if all_dep_types:
-            # TODO this is very inefficient, as it resolves the `names` glob to
-            # reldeps four more times, which in a reasonably wide glob like
-            # `dnf repoquery --whatdepends "libdnf*"` can take roughly 50% of
-            # the total execution time.
-            depquery = depquery.union(query.filter(recommends__glob=names))
-            depquery = depquery.union(query.filter(enhances__glob=names))
-            depquery = depquery.union(query.filter(supplements__glob=names))
-            depquery = depquery.union(query.filter(suggests__glob=names))
-
-            depquery = depquery.union(query.filter(recommends=resolved_nevras_query))
-            depquery = depquery.union(query.filter(enhances=resolved_nevras_query))
-            depquery = depquery.union(query.filter(supplements=resolved_nevras_query))
-            depquery = depquery.union(query.filter(suggests=resolved_nevras_query))
+        for dep_type in dep_types:
+            depquery = depquery.union(query.filter(**{dep_type: resolved_nevras_query}))
 
         if self.opts.recursive:
             depquery = self._do_recursive_deps(query, depquery)
@@ -601,33 +774,30 @@ class RepoQueryCommand(commands.Command):
                 if self.opts.recursive:
                     providers = providers.union(
                         self._get_recursive_providers_query(query, providers))
+                if self.opts.stream:
+                    self._print_stream(self.build_format_fn(self.opts, pkg)
+                                       for pkg in providers.latest().run())
+                    return
                 pkgs = set()
                 for pkg in providers.latest().run():
                     pkgs.add(self.build_format_fn(self.opts, pkg))
             else:
                 pkgs.update(str(rel) for rel in rels)
         elif self.opts.location:
+            if self.opts.stream:
+                self._print_stream(location for location in
+                                   (pkg.remote_location() for pkg in q.run())
+                                   if location is not None)
+                return
             for pkg in q.run():
                 location = pkg.remote_location()
                 if location is not None:
                     pkgs.add(location)
         elif self.opts.deplist:
-            pkgs = []
-            for pkg in sorted(set(q.run())):
-                if self.opts.list != 'userinstalled' or self.base.history.user_installed(pkg):
-                    deplist_output = []
-                    deplist_output.append('package: ' + str(pkg))
-                    for req in sorted([str(req) for req in pkg.requires]):
-                        deplist_output.append('  dependency: ' + req)
-                        subject = dnf.subject.Subject(req)
-                        query = subject.get_best_query(self.base.sack)
-                        query = self.filter_repo_arch(
-                            self.opts, query.available())
-                        if not self.opts.verbose:
-                            query = query.latest()
-                        for provider in query.run():
-                            deplist_output.append('   provider: ' + str(provider))
-                    pkgs.append('\n'.join(deplist_output))
+            if self.opts.stream:
+                self._print_stream(self._deplist(q.run()), '\n\n')
+                return
+            pkgs = list(self._deplist(sorted(set(q.run()))))
             if pkgs:
                 print('\n\n'.join(pkgs))
             return
@@ -636,6 +806,13 @@ class RepoQueryCommand(commands.Command):
             return
 
         else:
+            if self.opts.stream:
+                self._print_stream(
+                    (self.build_format_fn(self.opts, pkg) for pkg in q.run()
+                     if self.opts.list != 'userinstalled' or
+                     self.base.history.user_installed(pkg)),
+                    "\n\n" if self.opts.queryinfo else "\n")
+                return
             for pkg in q.run():
                 if self.opts.list != 'userinstalled' or self.base.history.user_installed(pkg):
                     pkgs.add(self.build_format_fn(self.opts, pkg))
@@ -646,17 +823,52 @@ class RepoQueryCommand(commands.Command):
             else:
                 print("\n".join(sorted(pkgs)))
 
+    def _providers(self, req):
+        """Return the provider lines of a --deplist dependency."""
+        subject = dnf.subject.Subject(req)
+        query = subject.get_best_query(self.base.sack)
+        query = self.filter_repo_arch(self.opts, query.available())
+        if not self.opts.verbose:
+            query = query.latest()
+        return ['   provider: ' + str(provider) for provider in query.run()]
+
+    def _deplist(self, pkgs):
+        """Generate the --deplist report of every package.
+
+        Packages share most of their dependencies, each distinct one is
+        resolved to its providers only once.
+        """
+        providers = {}
+        for pkg in pkgs:
+            if self.opts.list != 'userinstalled' or self.base.history.user_installed(pkg):
+                deplist_output = []
+                deplist_output.append('package: ' + str(pkg))
+                for req in sorted([str(req) for req in pkg.requires]):
+                    deplist_output.append('  dependency: ' + req)
+                    if req not in providers:
+                        providers[req] = self._providers(req)
+                    deplist_output.extend(providers[req])
+                yield '\n'.join(deplist_output)
+
+    @staticmethod
+    def _print_stream(items, separator="\n"):
+        """Write the items to stdout as they are generated, separated like
+        the sorted output."""
+        write = sys.stdout.write
+        first = True
+        for item in items:
+            write(item if first else separator + item)
+            first = False
+        if not first:
+            write("\n")
+        sys.stdout.flush()
+
     def _group_member_report(self, query):
-        package_conf_dict = {}
-        for group in self.base.comps.groups:
-            package_conf_dict[group.id] = set([pkg.name for pkg in group.packages_iter()])
+        group_ids = self.base.comps._group_ids_by_package_name()
         group_package_dict = {}
         pkg_not_in_group = []
         for pkg in query.run():
-            group_id_list = []
-            for group_id, package_name_set in package_conf_dict.items():
-                if pkg.name in package_name_set:
-                    group_id_list.append(group_id)
+            group_id_list = group_ids.get(pkg.name)
             if group_id_list:
                 group_package_dict.setdefault(
                     '$'.join(sorted(group_id_list)), []).append(str(pkg))
@@ -684,26 +896,74 @@ class RepoQueryCommand(commands.Command):
         reqstr = "[" + str(len(requires)) + ": " + ", ".join(requires) + "]"
         print(spacing + r"\_ " + pkg_string + " " + reqstr)
 
-    def tree_seed(self, query, aquery, opts, level=-1, usedpkgs=None):
-        for pkg in sorted(set(query.run()), key=lambda p: p.name):
+    def _providers_by_na(self, reldep):
+        """Return {name.arch: package} of the providers of the reldep."""
+        key = str(reldep)
+        providers = self._tree_providers.get(key)
+        if providers is None:
+            providers = {}
+            for querypkg in self.base.sack.query().filterm(provides=reldep):
+                providers[querypkg.name + "." + querypkg.arch] = querypkg
+            self._tree_providers[key] = providers
+        return providers
+
+    def _children(self, pkg, aquery, opts):
+        """Return the packages below pkg in the tree, computed once per package."""
+        children = self._tree_children.get(pkg)
+        if children is None:
+            if opts.packageatr:
+                ar = {}
+                for name in set(getattr(pkg, opts.packageatr)):
+                    ar.update(self._providers_by_na(name))
+                pkgquery = self.base.sack.query().filterm(pkg=list(ar.values()))
+            else:
+                pkgquery = self.by_all_deps((pkg.name, ), aquery) if opts.alldeps \
+                    else self._dependents((pkg.name, ), aquery, DEP_TYPES[:1])
+            children = sorted(set(pkgquery.run()), key=lambda p: p.name)
+            self._tree_children[pkg] = children
+        return children
+
+    def _build_tree(self, pkgs, aquery, opts, level=-1, usedpkgs=None):
+        """Return the nodes of the tree as (pkg, children) pairs, children is
+        None for the packages that are not expanded again."""
+        nodes = []
+        for pkg in pkgs:
             usedpkgs = set() if usedpkgs is None or level == -1 else usedpkgs
             if pkg.name.startswith("rpmlib") or pkg.name.startswith("solvable"):
-                return
-            self.grow_tree(level, pkg, opts)
-            if pkg not in usedpkgs:
+                break
+            children = None
+            if pkg not in usedpkgs and (opts.tree_depth is None or level + 1 < opts.tree_depth):
                 usedpkgs.add(pkg)
-                if opts.packageatr:
-                    strpkg = getattr(pkg, opts.packageatr)
-                    ar = {}
-                    for name in set(strpkg):
-                        pkgquery = self.base.sack.query().filterm(provides=name)
-                        for querypkg in pkgquery:
-                            ar[querypkg.name + "." + querypkg.arch] = querypkg
-                    pkgquery = self.base.sack.query().filterm(pkg=list(ar.values()))
-                else:
-                    pkgquery = self.by_all_deps((pkg.name, ), aquery) if opts.alldeps \
-                        else aquery.filter(requires__glob=pkg.name)
-                self.tree_seed(pkgquery, aquery, opts, level + 1, usedpkgs)
+                children = self._build_tree(
+                    self._children(pkg, aquery, opts), aquery, opts, level + 1, usedpkgs)
+            nodes.append((pkg, children))
+        return nodes
+
+    def _print_tree(self, nodes, opts, level=-1):
+        for pkg, children in nodes:
+            self.grow_tree(level, pkg, opts)
+            if children:
+                self._print_tree(children, opts, level + 1)
+
+    def _tree_json(self, nodes, opts):
+        tree = []
+        for pkg, children in nodes:
+            node = {'package': self.build_format_fn(opts, pkg),
+                    'requires': [str(reldep) for reldep in pkg.requires]}
+            if children is not None:
+                node['dependencies'] = self._tree_json(children, opts)
+            tree.append(node)
+        return tree
+
+    def tree_seed(self, query, aquery, opts, level=-1, usedpkgs=None):
+        self._tree_children = {}
+        self._tree_providers = {}
+        nodes = self._build_tree(sorted(set(query.run()), key=lambda p: p.name),
+                                 aquery, opts, level, usedpkgs)
+        if opts.tree_format == 'json':
+            print(json.dumps(self._tree_json(nodes, opts), indent=4))
+        else:
+            self._print_tree(nodes, opts, level)
 
 
 class PackageWrapper(object):
@@ -716,10 +976,14 @@ class PackageWrapper(object):
     def __getattr__(self, attr):
         atr = getattr(self._pkg, attr)
         if atr is None:
-            return "(none)"
-        if isinstance(atr, list):
-            return '\n'.join(sorted({dnf.i18n.ucd(reldep) for reldep in atr}))
-        return dnf.i18n.ucd(atr)
+            value = "(none)"
+        elif isinstance(atr, list):
+            value = '\n'.join(sorted({dnf.i18n.ucd(reldep) for reldep in atr}))
+        else:
+            value = dnf.i18n.ucd(atr)
+        # __getattr__ is not consulted for attributes found in the instance
+        self.__dict__[attr] = value
+        return value
 
     @staticmethod
     def _get_timestamp(timestamp):
@@ -59,6 +59,10 @@ class DemandSheet(object):
 
     transaction_display = None
 
+    # Ids of the repositories the command needs. If it stays None, all enabled
+    # repositories are loaded when available_repos is demanded.
+    available_repo_ids = None
+
     # This demand controlls applicability of the plugins that could filter
     # repositories packages (e.g. versionlock).
     # If it stays None, the demands.resolving is used as a fallback.
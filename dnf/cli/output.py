@@ -44,6 +44,7 @@ import dnf.cli.term
 import dnf.conf
 import dnf.crypto
 import dnf.i18n
+import dnf.package
 import dnf.transaction
 import dnf.util
 import dnf.yum.misc
@@ -914,6 +915,7 @@ class Output(object):
         locsize = 0
         insize = 0
         error = False
+        dnf.package._verify_local_pkgs(packages)
         for pkg in packages:
             # Just to be on the safe side, if for some reason getting
             # the package size fails, log the error and don't report download
@@ -348,6 +348,7 @@ class Comps(object):
     def __init__(self):
         self._i = libcomps.Comps()
         self._langs = _Langs()
+        self._package_groups = None
 
     def __len__(self):
         return _internal_comps_length(self._i)
@@ -372,6 +373,24 @@ class Comps(object):
             errors = comps.get_last_errors()
             raise CompsError(' '.join(errors))
         self._i += comps
+        self._package_groups = None
+
+    def _arch_filter(self, arches):
+        self._i.arch_filter(arches)
+        self._package_groups = None
+
+    def _group_ids_by_package_name(self):
+        """Return {package name: set of ids of the groups containing it}.
+
+        The index is built on first use and kept until the comps change.
+        """
+        if self._package_groups is None:
+            index = {}
+            for group in self.groups_iter():
+                for pkg in group.packages_iter():
+                    index.setdefault(pkg.name, set()).add(group.id)
+            self._package_groups = index
+        return self._package_groups
 
     @property
     def categories(self):
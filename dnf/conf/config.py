@@ -57,6 +57,9 @@ class BaseConfig(object):
 
     """
 
+    # options implemented in the Python layer that can be set from INI files
+    _python_options = ('arch',)
+
     def __init__(self, config=None, section=None, parser=None):
         self.__dict__["_config"] = config
         self._section = section
@@ -151,8 +154,12 @@ class BaseConfig(object):
                         logger.error(_('Invalid configuration value: %s=%s in %s; %s'),
                                      ucd(name), ucd(value), ucd(filename), str(e))
                 else:
-                    if name == 'arch' and hasattr(self, name):
-                        setattr(self, name, value)
+                    if name in self._python_options and hasattr(self, name):
+                        try:
+                            setattr(self, name, value)
+                        except dnf.exceptions.ConfigError as e:
+                            logger.error(_('Invalid configuration value: %s=%s in %s; %s'),
+                                         ucd(name), ucd(value), ucd(filename), str(e))
                     else:
                         logger.debug(
                             _('Unknown configuration option: %s = %s in %s'),
@@ -223,6 +230,10 @@ class BaseConfig(object):
 class MainConf(BaseConfig):
     # :api
     """Configuration option definitions for dnf.conf's [main] section."""
+
+    _python_options = BaseConfig._python_options + ('max_parallel_metadata', 'download_pipeline',
+                                                    'deltarpm_jobs')
+
     def __init__(self, section='main', parser=None):
         # pylint: disable=R0915
         config = libdnf.conf.ConfigMain()
@@ -250,6 +261,10 @@ class MainConf(BaseConfig):
         # track list of temporary files created
         self.tempfiles = []
 
+        self._max_parallel_metadata = 1
+        self._download_pipeline = False
+        self._deltarpm_jobs = 0
+
     def __del__(self):
         if hasattr(self, 'tempfiles'):
             for file_name in self.tempfiles:
@@ -465,6 +480,59 @@ class MainConf(BaseConfig):
             raise dnf.exceptions.Error(msg.format("basearch", val))
         self.substitutions['basearch'] = val
 
+    @property
+    def max_parallel_metadata(self):
+        # :api
+        """Maximum number of repositories whose metadata are loaded simultaneously."""
+        return self._max_parallel_metadata
+
+    @max_parallel_metadata.setter
+    def max_parallel_metadata(self, val):
+        # :api
+        try:
+            number = int(val)
+        except (TypeError, ValueError):
+            number = 0
+        if number < 1:
+            msg = _('Incorrect or unknown "{}": {}')
+            raise dnf.exceptions.ConfigError(msg.format("max_parallel_metadata", val))
+        self._max_parallel_metadata = number
+
+    @property
+    def deltarpm_jobs(self):
+        # :api
+        """Maximum number of simultaneous delta RPM rebuilds, 0 means one per available CPU."""
+        return self._deltarpm_jobs
+
+    @deltarpm_jobs.setter
+    def deltarpm_jobs(self, val):
+        # :api
+        try:
+            number = int(val)
+        except (TypeError, ValueError):
+            number = -1
+        if number < 0:
+            msg = _('Incorrect or unknown "{}": {}')
+            raise dnf.exceptions.ConfigError(msg.format("deltarpm_jobs", val))
+        self._deltarpm_jobs = number
+
+    @property
+    def download_pipeline(self):
+        # :api
+        """Whether downloaded packages are processed while other downloads are in flight."""
+        return self._download_pipeline
+
+    @download_pipeline.setter
+    def download_pipeline(self, val):
+        # :api
+        option = libdnf.conf.OptionBool(False)
+        try:
+            option.set(PRIO_DEFAULT, bool(val) if isinstance(val, int) else val)
+        except RuntimeError as e:
+            raise dnf.exceptions.ConfigError(_("Error parsing '%s': %s") % (val, str(e)),
+                                             raw_error=str(e))
+        self._download_pipeline = option.getValue()
+
     def read(self, filename=None, priority=PRIO_DEFAULT):
         # :api
         if filename is None:
@@ -21,6 +21,7 @@
 import libdnf.transaction
 
 import dnf.db.history
+import dnf.package
 import dnf.transaction
 import dnf.exceptions
 from dnf.i18n import _
@@ -28,6 +29,16 @@ from dnf.util import logger
 
 import rpm
 
+# actions adding the header of the package file to the rpm transaction
+_HEADER_ACTIONS = (
+    libdnf.transaction.TransactionItemAction_DOWNGRADE,
+    libdnf.transaction.TransactionItemAction_INSTALL,
+    libdnf.transaction.TransactionItemAction_OBSOLETE,
+    libdnf.transaction.TransactionItemAction_REINSTALL,
+    libdnf.transaction.TransactionItemAction_UPGRADE,
+)
+
+
 class PersistorBase(object):
     def __init__(self, history):
         assert isinstance(history, dnf.db.history.SwdbInterface), str(type(history))
@@ -257,7 +268,7 @@ class RPMTransaction(object):
 
     def get_reason(self, pkg):
         """Get reason for package"""
-        return self.history.swdb.resolveRPMTransactionItemReason(pkg.name, pkg.arch, -1)
+        return self.history.reason(pkg)
 
     def get_reason_name(self, pkg):
         """Get reason for package"""
@@ -316,6 +327,10 @@ class RPMTransaction(object):
         """Populate the RPM transaction set."""
         modular_problems = 0
 
+        # read the headers of the packages to be installed up front
+        dnf.package._read_headers(
+            [tsi.pkg for tsi in self if tsi.action in _HEADER_ACTIONS])
+
         for tsi in self:
             try:
                 if tsi.action == libdnf.transaction.TransactionItemAction_DOWNGRADE:
@@ -18,8 +18,11 @@
 #
 
 import calendar
+import logging
 import os
+import sqlite3
 import time
+import urllib.parse
 
 import libdnf.transaction
 import libdnf.utils
@@ -30,6 +33,36 @@ from dnf.exceptions import DatabaseError
 
 from .group import GroupPersistor, EnvironmentPersistor, RPMTransaction
 
+logger = logging.getLogger('dnf')
+
+# the same selection of the items as libdnf does for a single package, the
+# actions DOWNGRADED, OBSOLETED, UPGRADED and REINSTALLED are skipped
+_REASONS_SQL = """
+    SELECT i.name, i.arch, ti.action, ti.reason
+    FROM trans_item ti
+    JOIN trans t ON ti.trans_id = t.id
+    JOIN rpm i USING (item_id)
+    JOIN temp.installed n ON n.name = i.name AND n.arch = i.arch
+    WHERE t.state = 1 AND ti.action NOT IN (3, 5, 7, 10)
+    ORDER BY ti.trans_id, ti.id
+"""
+
+_REPOS_SQL = """
+    SELECT i.name, i.epoch, i.version, i.release, i.arch, r.repoid
+    FROM trans_item ti
+    JOIN rpm i USING (item_id)
+    JOIN temp.installed n ON n.name = i.name AND n.arch = i.arch
+    JOIN repo r ON ti.repo_id = r.id
+    WHERE ti.action NOT IN (3, 5, 7, 10)
+    ORDER BY ti.id
+"""
+
+_INSTALLED_SQL = """
+    CREATE TEMP TABLE installed (name TEXT, arch TEXT, PRIMARY KEY (name, arch))
+"""
+
+_GROUP_PACKAGE_SQL = "UPDATE comps_group_package SET installed = ? WHERE id = ?"
+
 
 class RPMTransactionItemWrapper(object):
     def __init__(self, swdb, item):
@@ -278,7 +311,9 @@ class MergedTransactionWrapper(TransactionWrapper):
 
 class SwdbInterface(object):
 
-    def __init__(self, db_dir, releasever=""):
+    def __init__(self, db_dir, releasever="", installed_keys=None):
+        """`installed_keys` returns the (name, arch) pairs of the installed
+        packages, None while they are not known."""
         # TODO: record all vars
         # TODO: remove relreasever from options
         self.releasever = str(releasever)
@@ -289,6 +324,12 @@ class SwdbInterface(object):
         self._swdb = None
         self._db_dir = db_dir
         self._output = []
+        self._installed_keys = installed_keys
+        self._reasons = None
+        self._repos = None
+        self._package_data_keys = frozenset()
+        self._transaction_list = None
+        self._db_stamp = None
 
     def __del__(self):
         self.close()
@@ -345,12 +386,108 @@ class SwdbInterface(object):
             self._swdb.closeDatabase()
         self._swdb = None
         self._output = []
+        self._invalidate()
+
+    def _invalidate(self):
+        self._reasons = None
+        self._repos = None
+        self._package_data_keys = frozenset()
+        self._transaction_list = None
+        self._db_stamp = None
+
+    def _check_db_stamp(self):
+        """Drop the data read from the database if it was written since.
+
+        Other processes do not tell this one about their transactions, the
+        modification times and sizes of the database and its write-ahead log
+        are compared instead.
+        """
+        stamp = []
+        for path in (self.path, self.path + '-wal'):
+            try:
+                st = os.stat(path)
+            except OSError:
+                stamp.append(None)
+            else:
+                stamp.append((st.st_mtime_ns, st.st_size))
+        stamp = tuple(stamp)
+        if stamp != self._db_stamp:
+            self._invalidate()
+            self._db_stamp = stamp
+
+    def _load_package_data(self):
+        """Read the current reasons and repositories of the installed packages
+        from the database in a single pass.
+
+        Asking libdnf takes a query per package, which adds up when thousands
+        of installed packages are listed. Only the history of the installed
+        name.arch pairs is read, the callers ask libdnf about other packages.
+        Returns False if the installed packages are not known yet or the
+        database cannot be read this way, the callers then ask libdnf too.
+        """
+        self._check_db_stamp()
+        if self._reasons is not None:
+            return self._reasons is not False
+        keys = self._installed_keys() if self._installed_keys else None
+        if keys is None:
+            return False
+        keys = frozenset(keys)
+        reasons = {}
+        repos = {}
+        try:
+            uri = 'file:{}?mode=ro'.format(urllib.parse.quote(self.path))
+            conn = sqlite3.connect(uri, uri=True)
+            try:
+                conn.execute(_INSTALLED_SQL)
+                conn.executemany('INSERT INTO temp.installed VALUES (?, ?)', keys)
+                for name, arch, action, reason in conn.execute(_REASONS_SQL):
+                    if action == libdnf.transaction.TransactionItemAction_REMOVE:
+                        reason = libdnf.transaction.TransactionItemReason_UNKNOWN
+                    reasons[(name, arch)] = reason
+                for name, epoch, version, release, arch, repoid in conn.execute(_REPOS_SQL):
+                    repos[(name, epoch, version, release, arch)] = repoid
+            finally:
+                conn.close()
+        except sqlite3.Error as ex:
+            logger.debug('Cannot read the history database in bulk: %s', ex)
+            self._reasons = False
+            return False
+        self._reasons = reasons
+        self._repos = repos
+        self._package_data_keys = keys
+        return True
+
+    def _save_group_packages(self, packages):
+        """Save the changed comps group packages.
+
+        libdnf writes every package in a database transaction of its own. The
+        packages already stored in the database are updated together in a
+        single one instead, only the new ones are left to libdnf.
+        """
+        stored = [pkg for pkg in packages if pkg.getId()]
+        new = [pkg for pkg in packages if not pkg.getId()]
+        if stored:
+            try:
+                # do not wait for a lock, libdnf can save the packages itself
+                conn = sqlite3.connect(self.path, timeout=0)
+                try:
+                    with conn:
+                        conn.executemany(_GROUP_PACKAGE_SQL, [
+                            (int(pkg.getInstalled()), pkg.getId()) for pkg in stored])
+                finally:
+                    conn.close()
+            except sqlite3.Error as ex:
+                logger.debug('Cannot update the group packages in bulk: %s', ex)
+                new = packages
+        for pkg in new:
+            pkg.save()
 
     @property
     def path(self):
         return self.swdb.getPath()
 
     def reset_db(self):
+        self._invalidate()
         return self.swdb.resetDatabase()
 
     # TODO: rename to get_last_transaction?
@@ -361,15 +498,44 @@ class SwdbInterface(object):
             return None
         return TransactionWrapper(t)
 
+    def _transactions(self):
+        """Return the libdnf transactions of the history, the oldest first.
+
+        The list is kept until the history is written to.
+        """
+        self._check_db_stamp()
+        if self._transaction_list is None:
+            self._transaction_list = self.swdb.listTransactions()
+        return self._transaction_list
+
     # TODO: rename to: list_transactions?
-    def old(self, tids=None, limit=0, complete_transactions_only=False):
-        tids = tids or []
-        tids = [int(i) for i in tids]
-        result = self.swdb.listTransactions()
-        result = [TransactionWrapper(i) for i in result]
+    def old(self, tids=None, limit=0, complete_transactions_only=False, offset=0,
+            tid_range=None):
+        """Return the transactions of the history, the newest first.
+
+        :param tids: ids of the transactions to return, all of them if empty
+        :param limit: return at most this many transactions, 0 for all of them
+        :param offset: skip this many of the newest selected transactions
+        :param tid_range: (first, last) tuple, return only the transactions
+            with ids in the inclusive range
+        """
+        tids = set(int(i) for i in tids or [])
+        result = self._transactions()
         # TODO: move to libdnf
-        if tids:
-            result = [i for i in result if i.tid in tids]
+        if tids or tid_range:
+            first, last = tid_range or (None, None)
+            result = [t for t in result
+                      if (not tids or t.getId() in tids) and
+                      (first is None or t.getId() >= first) and
+                      (last is None or t.getId() <= last)]
+        end = len(result) - offset
+        if end <= 0:
+            return []
+        begin = max(end - limit, 0) if limit else 0
+        # the markers compare a transaction with its selected neighbours, the
+        # window includes one more transaction on each side
+        low, high = max(begin - 1, 0), min(end + 1, len(result))
+        result = [TransactionWrapper(i) for i in result[low:high]]
 
         # populate altered_lt_rpmdb and altered_gt_rpmdb
         for i, trans in enumerate(result):
@@ -379,6 +545,7 @@ class SwdbInterface(object):
             if trans._trans.getRpmdbVersionBegin() != prev_trans._trans.getRpmdbVersionEnd():
                 trans.altered_lt_rpmdb = True
                 prev_trans.altered_gt_rpmdb = True
+        result = result[begin - low:len(result) - (high - end)]
         return result[::-1]
 
     def get_current(self):
@@ -391,6 +558,7 @@ class SwdbInterface(object):
         action = libdnf.transaction.TransactionItemAction_REASON_CHANGE
         ti = self.swdb.addItem(rpm_item, repoid, action, reason)
         ti.setState(libdnf.transaction.TransactionItemState_DONE)
+        # the item is stored when the transaction ends, which drops the maps
         return ti
 
     '''
@@ -401,6 +569,9 @@ class SwdbInterface(object):
 
     def repo(self, pkg):
         """Get repository of package"""
+        if self._load_package_data() and (pkg.name, pkg.arch) in self._package_data_keys:
+            return self._repos.get(
+                (pkg.name, pkg.epoch or 0, pkg.version, pkg.release, pkg.arch), "")
         return self.swdb.getRPMRepo(str(pkg))
 
     def package_data(self, pkg):
@@ -412,10 +583,12 @@ class SwdbInterface(object):
         result = RPMTransactionItemWrapper(self, result)
         return result
 
-#    def reason(self, pkg):
-#        """Get reason for package"""
-#        result = self.swdb.resolveRPMTransactionItemReason(pkg.name, pkg.arch, -1)
-#        return result
+    def reason(self, pkg):
+        """Get reason for package"""
+        if self._load_package_data() and (pkg.name, pkg.arch) in self._package_data_keys:
+            return self._reasons.get(
+                (pkg.name, pkg.arch), libdnf.transaction.TransactionItemReason_UNKNOWN)
+        return self.swdb.resolveRPMTransactionItemReason(pkg.name, pkg.arch, -1)
 
     # TODO: rename to begin_transaction?
     def beg(self, rpmdb_version, using_pkgs, tsis, cmdline=None, comment=""):
@@ -432,6 +605,7 @@ class SwdbInterface(object):
             comment)
         self.swdb.setReleasever(self.releasever)
         self._tid = tid
+        self._invalidate()
 
         return tid
 
@@ -482,6 +656,7 @@ class SwdbInterface(object):
             str(end_rpmdb_version),
             return_code,
         )
+        self._invalidate()
 
         # Closing and cleanup is done in the close() method.
         # It is important to keep data around after the transaction ends
@@ -495,7 +670,7 @@ class SwdbInterface(object):
 
     def user_installed(self, pkg):
         """Returns True if package is user installed"""
-        reason = self.swdb.resolveRPMTransactionItemReason(pkg.name, pkg.arch, -1)
+        reason = self.reason(pkg)
         if reason == libdnf.transaction.TransactionItemReason_USER:
             return True
         # if reason is not known, consider a package user-installed
@@ -515,7 +690,7 @@ class SwdbInterface(object):
             # return the reason at the point of rollback; we're setting that reason
             result = self.swdb.resolveRPMTransactionItemReason(pkg.name, pkg.arch, first_trans)
         else:
-            result = self.swdb.resolveRPMTransactionItemReason(pkg.name, pkg.arch, -1)
+            result = self.reason(pkg)
 
         # consider unknown reason as user-installed
         if result == libdnf.transaction.TransactionItemReason_UNKNOWN:
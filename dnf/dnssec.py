@@ -25,8 +25,11 @@ from __future__ import unicode_literals
 from enum import Enum
 import base64
 import hashlib
+import json
 import logging
+import os
 import re
+import time
 
 from dnf.i18n import _
 import dnf.rpm
@@ -37,6 +40,9 @@ logger = logging.getLogger("dnf")
 
 RR_TYPE_OPENPGPKEY = 61
 
+# File in cachedir keeping the verification results until their DNS TTL expires
+_CACHE_FILENAME = "dnssec_keys.json"
+
 
 class DnssecError(dnf.exceptions.Error):
     """
@@ -141,6 +147,13 @@ class DNSSECKeyVerification:
     _cache = {}
     # type: Dict[str, Union[str, NoKey]]
 
+    # Mapping from email address to the time the cached result expires according to its DNS TTL
+    _cache_expires = {}
+    # type: Dict[str, float]
+
+    # Unbound context shared by all the lookups, created on the first cache miss
+    _ctx = None
+
     @staticmethod
     def _cache_hit(key_union, input_key_string):
         # type: (Union[str, NoKey], str) -> Validity
@@ -159,19 +172,23 @@ class DNSSECKeyVerification:
             return Validity.REVOKED
 
     @staticmethod
-    def _cache_miss(input_key):
-        # type: (KeyInfo) -> Validity
-        """
-        In case the key was not found in the cache, create an Unbound context and contact the DNS
-        system
-        """
+    def _unbound():
         try:
             import unbound
         except ImportError as e:
             msg = _("Configuration option 'gpgkey_dns_verification' requires "
                     "python3-unbound ({})".format(e))
             raise dnf.exceptions.Error(msg)
+        return unbound
 
+    @staticmethod
+    def _context():
+        """
+        Return the Unbound context, create it on the first call.
+        """
+        if DNSSECKeyVerification._ctx is not None:
+            return DNSSECKeyVerification._ctx
+        unbound = DNSSECKeyVerification._unbound()
         ctx = unbound.ub_ctx()
         if ctx.set_option("verbosity:", "0") != 0:
             logger.debug("Unbound context: Failed to set verbosity")
@@ -185,12 +202,16 @@ class DNSSECKeyVerification:
         if ctx.add_ta_file("/var/lib/unbound/root.key") != 0:
             logger.debug("Unbound context: Failed to add trust anchor file")
 
-        if input_key.email is None:
-            logger.debug("A key has no associated e-mail address")
-            return Validity.ERROR
+        DNSSECKeyVerification._ctx = ctx
+        return ctx
 
-        status, result = ctx.resolve(email2location(input_key.email),
-                                     RR_TYPE_OPENPGPKEY, unbound.RR_CLASS_IN)
+    @staticmethod
+    def _eval_result(input_key, status, result):
+        # type: (KeyInfo, int, unbound.ub_result) -> Validity
+        """
+        Evaluate the result of the DNS lookup of the input key.
+        """
+        unbound = DNSSECKeyVerification._unbound()
         if status != 0:
             logger.debug("Communication with DNS servers failed")
             return Validity.ERROR
@@ -220,6 +241,39 @@ class DNSSECKeyVerification:
                 logger.debug("Input key   : {}".format(input_key.key))
                 return Validity.REVOKED
 
+    @staticmethod
+    def _cache_miss(input_key):
+        # type: (KeyInfo) -> Validity
+        """
+        In case the key was not found in the cache, contact the DNS system
+        """
+        ctx = DNSSECKeyVerification._context()
+        unbound = DNSSECKeyVerification._unbound()
+        if input_key.email is None:
+            logger.debug("A key has no associated e-mail address")
+            return Validity.ERROR
+
+        status, result = ctx.resolve(email2location(input_key.email),
+                                     RR_TYPE_OPENPGPKEY, unbound.RR_CLASS_IN)
+        validity = DNSSECKeyVerification._eval_result(input_key, status, result)
+        DNSSECKeyVerification._store(input_key, validity, getattr(result, 'ttl', 0))
+        return validity
+
+    @staticmethod
+    def _store(input_key, validity, ttl):
+        # type: (KeyInfo, Validity, int) -> None
+        """
+        Store the result of the DNS lookup into the cache.
+        """
+        if validity == Validity.VALID:
+            DNSSECKeyVerification._cache[input_key.email] = input_key.key
+        elif validity == Validity.PROVEN_NONEXISTENCE:
+            DNSSECKeyVerification._cache[input_key.email] = NoKey()
+        else:
+            return
+        if ttl:
+            DNSSECKeyVerification._cache_expires[input_key.email] = time.time() + ttl
+
     @staticmethod
     def verify(input_key):
         # type: (KeyInfo) -> Validity
@@ -231,12 +285,92 @@ class DNSSECKeyVerification:
         if key_union is not None:
             return DNSSECKeyVerification._cache_hit(key_union, input_key.key)
         else:
-            result = DNSSECKeyVerification._cache_miss(input_key)
-            if result == Validity.VALID:
-                DNSSECKeyVerification._cache[input_key.email] = input_key.key
-            elif result == Validity.PROVEN_NONEXISTENCE:
-                DNSSECKeyVerification._cache[input_key.email] = NoKey()
-            return result
+            return DNSSECKeyVerification._cache_miss(input_key)
+
+    @staticmethod
+    def verify_all(input_keys):
+        # type: (List[KeyInfo]) -> List[Union[Validity, DnssecError]]
+        """
+        Verify KeyInfo objects issuing all the DNS lookups for the keys missing in the cache
+        concurrently. Returns the results in the order of the input keys, DnssecError in place of
+        the result if the key could not be verified.
+        """
+        results = [None] * len(input_keys)
+        misses = []
+        for i, input_key in enumerate(input_keys):
+            key_union = DNSSECKeyVerification._cache.get(input_key.email)
+            if key_union is not None:
+                results[i] = DNSSECKeyVerification._cache_hit(key_union, input_key.key)
+            elif input_key.email is None:
+                logger.debug("A key has no associated e-mail address")
+                results[i] = Validity.ERROR
+            else:
+                try:
+                    misses.append((i, email2location(input_key.email)))
+                except DnssecError as e:
+                    results[i] = e
+        if not misses:
+            return results
+
+        ctx = DNSSECKeyVerification._context()
+        unbound = DNSSECKeyVerification._unbound()
+
+        def callback(i, status, result):
+            input_key = input_keys[i]
+            validity = DNSSECKeyVerification._eval_result(input_key, status, result)
+            DNSSECKeyVerification._store(input_key, validity, getattr(result, 'ttl', 0))
+            results[i] = validity
+
+        for i, location in misses:
+            logger.debug("Running verification for key with id: {}".format(input_keys[i].email))
+            status, _async_id = ctx.resolve_async(location, i, callback,
+                                                  RR_TYPE_OPENPGPKEY, unbound.RR_CLASS_IN)
+            if status != 0:
+                logger.debug("Communication with DNS servers failed")
+                results[i] = Validity.ERROR
+        ctx.wait()
+        return [Validity.ERROR if r is None else r for r in results]
+
+    @staticmethod
+    def load_cache(cachedir):
+        # type: (str) -> None
+        """
+        Load the results stored by save_cache() whose TTL did not expire yet.
+        """
+        path = os.path.join(cachedir, _CACHE_FILENAME)
+        try:
+            with open(path, 'r') as f:
+                entries = {email: (key, float(expires))
+                           for email, (key, expires) in json.load(f).items()}
+        except (IOError, OSError, ValueError, TypeError, AttributeError):
+            return
+        now = time.time()
+        for email, (key, expires) in entries.items():
+            if expires <= now or email in DNSSECKeyVerification._cache:
+                continue
+            DNSSECKeyVerification._cache[email] = NoKey() if key is None else key.encode('ascii')
+            DNSSECKeyVerification._cache_expires[email] = expires
+
+    @staticmethod
+    def save_cache(cachedir):
+        # type: (str) -> None
+        """
+        Store the cached results with unexpired TTL to the cachedir.
+        """
+        now = time.time()
+        entries = {}
+        for email, expires in DNSSECKeyVerification._cache_expires.items():
+            key_union = DNSSECKeyVerification._cache.get(email)
+            if key_union is None or expires <= now:
+                continue
+            key = None if isinstance(key_union, NoKey) else key_union.decode('ascii')
+            entries[email] = (key, expires)
+        path = os.path.join(cachedir, _CACHE_FILENAME)
+        try:
+            with open(path, 'w') as f:
+                json.dump(entries, f)
+        except (IOError, OSError) as e:
+            logger.debug(any_msg("Failed to store the cache: {}".format(e)))
 
 
 def nice_user_msg(ki, v):
@@ -304,16 +438,16 @@ class RpmImportedKeys:
         return return_list
 
     @staticmethod
-    def check_imported_keys_validity():
+    def check_imported_keys_validity(cachedir=None):
         keys = RpmImportedKeys._query_db_for_gpg_keys()
         logger.info(any_msg(_("Testing already imported keys for their validity.")))
-        for key in keys:
-            try:
-                result = DNSSECKeyVerification.verify(key)
-            except DnssecError as e:
+        if cachedir is not None:
+            DNSSECKeyVerification.load_cache(cachedir)
+        for key, result in zip(keys, DNSSECKeyVerification.verify_all(keys)):
+            if isinstance(result, DnssecError):
                 # Errors in this exception should not be fatal, print it and just continue
                 logger.warning("DNSSEC extension error (email={}): {}"
-                             .format(key.email, e.value))
+                             .format(key.email, result.value))
                 continue
             # TODO: remove revoked keys automatically and possibly ask user to confirm
             if result == Validity.VALID:
@@ -331,3 +465,5 @@ class RpmImportedKeys:
                                     " be removed immediately".format(key.email)))
             else:
                 logger.debug(any_msg("GPG Key {} could not be tested".format(key.email)))
+        if cachedir is not None:
+            DNSSECKeyVerification.save_cache(cachedir)
@@ -28,11 +28,16 @@ import dnf.callback
 import dnf.logging
 import dnf.repo
 import hawkey
+import heapq
+import itertools
 import logging
 import libdnf.repo
+import math
 import os
+import time
 
 APPLYDELTA = '/usr/bin/applydeltarpm'
+CGROUP_MOUNT = '/sys/fs/cgroup'
 
 logger = logging.getLogger("dnf")
 
@@ -51,6 +56,16 @@ class DeltaPayload(dnf.repo.PackagePayload):
         if lr_status != libdnf.repo.PackageTargetCB.TransferStatus_ERROR:
             self.delta_info.enqueue(self)
 
+    def _progress_cb(self, cbdata, total, done):
+        super(DeltaPayload, self)._progress_cb(cbdata, total, done)
+        # start queued rebuilds as soon as a slot is free
+        self.delta_info._reap()
+
+    def _complete(self):
+        # only the delta is downloaded, the package is complete once it is
+        # rebuilt, see DeltaInfo.job_done()
+        pass
+
     def _target_params(self):
         delta = self.delta
         ctype, csum = delta.chksum
@@ -82,30 +97,128 @@ class DeltaPayload(dnf.repo.PackagePayload):
         return os.path.join(self.pkg.repo.pkgdir, os.path.basename(location))
 
 
+def _cgroup_cpu_quota():
+    """Return the CPU quota of the cgroup of this process as a number of CPUs,
+    or None if it is not limited."""
+    paths = []
+    try:
+        with open('/proc/self/cgroup') as f:
+            for line in f:
+                hierarchy, controllers, path = line.rstrip('\n').split(':', 2)
+                if hierarchy == '0':
+                    paths.append((os.path.join(CGROUP_MOUNT + path, 'cpu.max'), None))
+                elif 'cpu' in controllers.split(','):
+                    directory = os.path.join(CGROUP_MOUNT, controllers) + path
+                    paths.append((os.path.join(directory, 'cpu.cfs_quota_us'),
+                                  os.path.join(directory, 'cpu.cfs_period_us')))
+    except (EnvironmentError, ValueError):
+        pass
+    paths.append((os.path.join(CGROUP_MOUNT, 'cpu.max'), None))
+    for quota_path, period_path in paths:
+        try:
+            with open(quota_path) as f:
+                values = f.read().split()
+            if period_path is not None:
+                with open(period_path) as f:
+                    values.extend(f.read().split())
+            quota, period = values[0], int(values[1])
+            if quota == 'max' or int(quota) < 0:
+                return None
+            return int(quota) / period
+        except (EnvironmentError, IndexError, ValueError, ZeroDivisionError):
+            continue
+    return None
+
+
+def _cpu_budget():
+    """Return the number of CPUs this process may use, honoring the CPU
+    affinity and the cgroup CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 4
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, int(math.ceil(quota)))
+    return max(cpus, 1)
+
+
+class DeltaCostModel(object):
+    '''Estimate of the time needed to get a package with and without a delta
+       bandwidth -- download speed in bytes per second
+       rebuild_rate -- applydeltarpm speed in bytes of rebuilt package per second
+       Both are None until measured, the model is only used once both are known.
+    '''
+
+    # weight of a new measurement in the running averages
+    WEIGHT = 0.5
+
+    def __init__(self, bandwidth=None, rebuild_rate=None):
+        self.bandwidth = bandwidth
+        self.rebuild_rate = rebuild_rate
+
+    @property
+    def known(self):
+        return bool(self.bandwidth and self.rebuild_rate)
+
+    def full_cost(self, po):
+        return po.downloadsize / self.bandwidth
+
+    def delta_cost(self, po, delta):
+        return delta.downloadsize / self.bandwidth + po._size / self.rebuild_rate
+
+    def _average(self, old, new):
+        if not new:
+            return old
+        if not old:
+            return new
+        return old * (1 - self.WEIGHT) + new * self.WEIGHT
+
+    def update(self, bandwidth=None, rebuild_rate=None):
+        self.bandwidth = self._average(self.bandwidth, bandwidth)
+        self.rebuild_rate = self._average(self.rebuild_rate, rebuild_rate)
+
+
 class DeltaInfo(object):
-    def __init__(self, query, progress, deltarpm_percentage=None):
+    def __init__(self, query, progress, deltarpm_percentage=None, deltarpm_jobs=None,
+                 cost_model=None):
         '''A delta lookup and rebuild context
            query -- installed packages to use when looking up deltas
            progress -- progress obj to display finished delta rebuilds
+           deltarpm_jobs -- maximum number of simultaneous rebuilds, by default
+                            the number of CPUs available to the process
+           cost_model -- DeltaCostModel deciding whether a delta pays off, the
+                         deltarpm_percentage limit is used while it knows nothing
         '''
         self.deltarpm_installed = False
         if os.access(APPLYDELTA, os.X_OK):
             self.deltarpm_installed = True
-        try:
-            self.deltarpm_jobs = os.sysconf('SC_NPROCESSORS_ONLN')
-        except (TypeError, ValueError):
-            self.deltarpm_jobs = 4
+        self.deltarpm_jobs = deltarpm_jobs or _cpu_budget()
         if deltarpm_percentage is None:
             self.deltarpm_percentage = dnf.conf.Conf().deltarpm_percentage
         else:
             self.deltarpm_percentage = deltarpm_percentage
         self.query = query
+        self._installed_evrs = None
         self.progress = progress
+        self.cost_model = cost_model or DeltaCostModel()
 
+        # heap of (-size of the rebuilt package, sequence number, payload), so
+        # that the largest rebuilds start first
         self.queue = []
+        self._sequence = itertools.count()
+        self._queued_size = 0
         self.jobs = {}
+        self._job_start = {}
         self.err = {}
 
+        # statistics used to predict whether a rebuild pays off
+        self._begin = time.time()
+        self._downloaded_size = 0
+        self._rebuilt_size = 0
+        self._rebuild_time = 0.0
+        self._rebuilds = 0
+
     def delta_factory(self, po, progress):
         '''Turn a po to Delta RPM po, if possible'''
         if not self.deltarpm_installed:
@@ -121,23 +234,40 @@ class DeltaInfo(object):
             # already there
             return None
 
-        best = po._size * self.deltarpm_percentage / 100
+        if self._installed_evrs is None:
+            self._installed_evrs = {}
+            for ipo in self.query:
+                self._installed_evrs.setdefault((ipo.name, ipo.arch), []).append(ipo.evr)
+        if self.cost_model.known:
+            best = self.cost_model.full_cost(po)
+            cost = self.cost_model.delta_cost
+        else:
+            best = po._size * self.deltarpm_percentage / 100
+            cost = lambda po, delta: delta.downloadsize
         best_delta = None
-        for ipo in self.query.filter(name=po.name, arch=po.arch):
-            delta = po.get_delta_from_evr(ipo.evr)
-            if delta and delta.downloadsize < best:
-                best = delta.downloadsize
+        for evr in self._installed_evrs.get((po.name, po.arch), ()):
+            delta = po.get_delta_from_evr(evr)
+            if delta and cost(po, delta) < best:
+                best = cost(po, delta)
                 best_delta = delta
         if best_delta:
             return DeltaPayload(self, best_delta, po, progress)
         return None
 
+    def _update_cost_model(self):
+        # feed the cost model with the speeds observed in this run
+        rebuild_rate = None
+        if self._rebuild_time:
+            rebuild_rate = self._rebuilt_size / self._rebuild_time
+        self.cost_model.update(getattr(self.progress, 'rate', None), rebuild_rate)
+
     def job_done(self, pid, code):
         # handle a finished delta rebuild
         logger.log(dnf.logging.SUBDEBUG, 'drpm: %d: return code: %d, %d', pid,
                    code >> 8, code & 0xff)
 
         pload = self.jobs.pop(pid)
+        duration = time.time() - self._job_start.pop(pid)
         pkg = pload.pkg
         if code != 0:
             unlink_f(pload.pkg.localPkg())
@@ -147,6 +277,12 @@ class DeltaInfo(object):
         else:
             os.unlink(pload.localPkg())
             self.progress.end(pload, dnf.callback.STATUS_DRPM, _('done'))
+            if pload._pipeline is not None:
+                pload._pipeline.submit(pkg)
+            self._rebuilt_size += pkg._size
+            self._rebuild_time += duration
+            self._rebuilds += 1
+            logger.log(dnf.logging.SUBDEBUG, 'drpm: %s rebuilt in %.2fs', pkg, duration)
 
     def start_job(self, pload):
         # spawn a delta rebuild job
@@ -157,24 +293,57 @@ class DeltaInfo(object):
         logger.log(dnf.logging.SUBDEBUG, 'drpm: spawned %d: %s', pid,
                    ' '.join(spawn_args[1:]))
         self.jobs[pid] = pload
+        self._job_start[pid] = time.time()
 
-    def enqueue(self, pload):
+    def _rebuild_slower_than_download(self, pload):
+        # predict whether the rebuild of pload, queued behind the current
+        # backlog, would finish later than a download of the full package
+        elapsed = time.time() - self._begin
+        if not self._rebuild_time or not self._downloaded_size or elapsed <= 0:
+            return False
+        rebuild_rate = self._rebuilt_size / self._rebuild_time * self.deltarpm_jobs
+        bandwidth = self._downloaded_size / elapsed
+        predicted = (self._queued_size + pload.pkg._size) / rebuild_rate
+        return predicted > pload._full_size / bandwidth
+
+    def _start_queued(self):
+        while self.queue and len(self.jobs) < self.deltarpm_jobs:
+            pload = heapq.heappop(self.queue)[2]
+            self._queued_size -= pload.pkg._size
+            self.start_job(pload)
+
+    def _reap(self):
         # process finished jobs, start new ones
-        while self.jobs:
-            pid, code = os.waitpid(-1, os.WNOHANG)
-            if not pid:
-                break
-            self.job_done(pid, code)
-        self.queue.append(pload)
-        while len(self.jobs) < self.deltarpm_jobs:
-            self.start_job(self.queue.pop(0))
-            if not self.queue:
-                break
+        for pid in list(self.jobs):
+            done, code = os.waitpid(pid, os.WNOHANG)
+            if done:
+                self.job_done(pid, code)
+        self._start_queued()
+
+    def enqueue(self, pload):
+        self._downloaded_size += pload.download_size
+        if self._rebuild_slower_than_download(pload):
+            logger.log(dnf.logging.SUBDEBUG,
+                       'drpm: %s: rebuild predicted slower than a full download', pload.pkg)
+            unlink_f(pload.localPkg())
+            self.err[pload.pkg] = [_('Delta RPM rebuild skipped, downloading the full package '
+                                     'is faster')]
+            return
+        heapq.heappush(self.queue, (-pload.pkg._size, next(self._sequence), pload))
+        self._queued_size += pload.pkg._size
+        self._reap()
 
     def wait(self):
         '''Wait until all jobs have finished'''
+        self._start_queued()
         while self.jobs:
-            pid, code = os.wait()
+            # block on the oldest of our own jobs, waiting for any child would
+            # reap other subprocesses (e.g. signature checks) as well
+            pid = next(iter(self.jobs))
+            _pid, code = os.waitpid(pid, 0)
             self.job_done(pid, code)
-            if self.queue:
-                self.start_job(self.queue.pop(0))
+            self._reap()
+        if self._rebuilds:
+            logger.debug('drpm: %d rebuilds, %.2fs of rebuild time, %.1f kB/s per job',
+                         self._rebuilds, self._rebuild_time,
+                         self._rebuilt_size / 1024 / max(self._rebuild_time, 0.001))
@@ -44,8 +44,39 @@ class MatchCounter(dict):
 
     The mapping is: ``package -> [(key, needle), ... ]``.
 
+    What the ranking and the printing need about a package is evaluated once
+    and kept until another match of the package is added.
+
     """
 
+    def __init__(self, *args, **kwargs):
+        super(MatchCounter, self).__init__(*args, **kwargs)
+        self._infos = {}
+
+    def __setitem__(self, pkg, matches):
+        self._infos.pop(pkg, None)
+        super(MatchCounter, self).__setitem__(pkg, matches)
+
+    def __delitem__(self, pkg):
+        self._infos.pop(pkg, None)
+        super(MatchCounter, self).__delitem__(pkg)
+
+    def _info(self, pkg):
+        """Return (weight, keys, needles, haystacks) of the matches of pkg."""
+        info = self._infos.get(pkg)
+        if info is None:
+            matches = self[pkg]
+            keys = []
+            haystack_by_key = {}
+            for key, _needle in matches:
+                if key not in haystack_by_key:
+                    keys.append(key)
+                    haystack_by_key[key] = getattr(pkg, key)
+            info = (self._eval_weights(pkg, matches), tuple(keys), frozenset(m[1] for m in matches),
+                    frozenset(haystack_by_key.values()))
+            self._infos[pkg] = info
+        return info
+
     @staticmethod
     def _eval_weights(pkg, matches):
         # how much is each match worth and return their sum:
@@ -75,7 +106,7 @@ class MatchCounter(dict):
         def get_key(pkg):
             return (
                 # use negative value to make sure packages with the highest weight come first
-                - self._eval_weights(pkg, self[pkg]),
+                - self._info(pkg)[0],
                 # then order packages alphabetically
                 pkg.name,
             )
@@ -88,6 +119,7 @@ class MatchCounter(dict):
         return 0
 
     def add(self, pkg, key, needle):
+        self._infos.pop(pkg, None)
         self.setdefault(pkg, []).append((key, needle))
 
     def dump(self):
@@ -95,19 +127,14 @@ class MatchCounter(dict):
             print('%s\t%s' % (pkg, self[pkg]))
 
     def matched_haystacks(self, pkg):
-        return set(getattr(pkg, m[0]) for m in self[pkg])
+        return self._info(pkg)[3]
 
     def matched_keys(self, pkg):
         # return keys in the same order they appear in the list
-        result = []
-        for i in self[pkg]:
-            if i[0] in result:
-                continue
-            result.append(i[0])
-        return result
+        return list(self._info(pkg)[1])
 
     def matched_needles(self, pkg):
-        return set(m[1] for m in self[pkg])
+        return self._info(pkg)[2]
 
     def sorted(self, reverse=False, limit_to=None):
         keys = limit_to if limit_to else self.keys()
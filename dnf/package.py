@@ -26,9 +26,11 @@ from __future__ import unicode_literals
 from dnf.i18n import _
 
 import binascii
+import concurrent.futures
 import dnf.exceptions
 import dnf.rpm
 import dnf.yum.misc
+import hashlib
 import hawkey
 import libdnf.error
 import libdnf.utils
@@ -38,6 +40,95 @@ import rpm
 
 logger = logging.getLogger("dnf")
 
+# results of checksum verification of package files, keyed by
+# (path, size, mtime, checksum type, checksum) so every file is hashed at most
+# once per run
+_verified = {}
+
+
+# RPM headers read ahead by the download pipeline, keyed by (path, size, mtime),
+# each is handed out once by Package._header
+_headers = {}
+
+
+def _file_key(path):
+    st = os.stat(path)
+    return (path, st.st_size, st.st_mtime)
+
+
+def _verification_key(path, chksum_type, chksum):
+    return _file_key(path) + (chksum_type, chksum)
+
+
+def _read_header(pkg):
+    """Read the header of the downloaded `pkg` for a later Package._header."""
+    path = pkg.localPkg()
+    key = _file_key(path)
+    if key not in _headers:
+        _headers[key] = dnf.rpm._header(path)
+
+
+def _local_header(path, ts=None):
+    """Return the header of the file at `path`, the one kept by _read_header
+    if it is still the same file."""
+    try:
+        hdr = _headers.pop(_file_key(path), None)
+    except EnvironmentError:
+        hdr = None
+    if hdr is None:
+        hdr = dnf.rpm._header(path, ts)
+    return hdr
+
+
+def _verify_local_pkgs(pkgs, max_workers=None):
+    """Hash the local files of `pkgs` in a pool of threads and remember the
+    results for Package.verifyLocalPkg().
+
+    Packages whose file is missing or whose checksum type is unknown to hashlib
+    are skipped and left to the serial verification.
+    """
+    def verify(pkg):
+        (chksum_type, chksum) = pkg.returnIdSum()
+        try:
+            key = _verification_key(pkg.localPkg(), chksum_type, chksum)
+            if key in _verified:
+                return
+            digest = hashlib.new(chksum_type)
+            with open(key[0], 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        except (EnvironmentError, TypeError, ValueError):
+            return
+        _verified[key] = digest.hexdigest() == chksum
+
+    pkgs = [pkg for pkg in pkgs if not pkg._from_system and not pkg._from_cmdline]
+    if not pkgs:
+        return
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(verify, pkgs))
+
+
+def _read_headers(pkgs):
+    """Read the headers of the local files of `pkgs` up front with a single
+    rpm transaction set and keep them on the packages for Package._header.
+
+    The rpm bindings are not thread safe, the headers are read one by one.
+    Packages whose header cannot be read are left to Package._header, which
+    reports the error.
+    """
+    pkgs = [pkg for pkg in pkgs if pkg._priv_header is None]
+    if not pkgs:
+        return
+    ts = dnf.rpm.transaction.initReadOnlyTransaction()
+    for pkg in pkgs:
+        try:
+            pkg._priv_header = _local_header(pkg.localPkg(), ts)
+        except (EnvironmentError, dnf.exceptions.Error):
+            pass
+    del ts
+
 
 class Package(hawkey.Package):
     """ Represents a package. #:api """
@@ -51,6 +142,7 @@ class Package(hawkey.Package):
         self._priv_chksum = None
         self._repo = None
         self._priv_size = None
+        self._priv_header = None
 
     @property
     def _chksum(self):
@@ -107,7 +199,10 @@ class Package(hawkey.Package):
         self.get_header(), which retrieves the header of an installed package
         from rpmdb.
         """
-        return dnf.rpm._header(self.localPkg())
+        if self._priv_header is not None:
+            return self._priv_header
+        self._priv_header = _local_header(self.localPkg())
+        return self._priv_header
 
     @property
     def _size(self):
@@ -335,7 +430,17 @@ class Package(hawkey.Package):
         if self._from_cmdline:
             return True # local package always verifies against itself
         (chksum_type, chksum) = self.returnIdSum()
+        path = self.localPkg()
+        try:
+            key = _verification_key(path, chksum_type, chksum)
+        except EnvironmentError:
+            key = None
+        if key in _verified:
+            return _verified[key]
         try:
-            return libdnf.utils.checksum_check(chksum_type, self.localPkg(), chksum)
+            result = libdnf.utils.checksum_check(chksum_type, path, chksum)
         except libdnf.error.Error as e:
             raise dnf.exceptions.MiscError(str(e))
+        if key is not None:
+            _verified[key] = result
+        return result
@@ -64,6 +64,56 @@ class JSONDB(object):
         with open(json_path, 'w') as f:
             json.dump(content, f)
 
+    def _load_keyed(self, key, error_msg):
+        """Return the data stored in db_path with `key`, None if there is none
+        or it was stored with a different key."""
+        if not os.path.isfile(self.db_path):
+            return None
+        try:
+            content = self._get_json_db(self.db_path, default={})
+        except OSError as e:
+            logger.debug(error_msg, e)
+            return None
+        if not isinstance(content, dict) or content.get('key') != key:
+            return None
+        return content.get('data')
+
+    def _save_keyed(self, key, data, error_msg):
+        try:
+            dnf.util.ensure_dir(os.path.dirname(self.db_path))
+            self._write_json_db(self.db_path, {'key': key, 'data': data})
+        except OSError as e:
+            logger.warning(error_msg, e)
+            return False
+        return True
+
+
+class DeltaRpmStatsPersistor(JSONDB):
+    """Download bandwidth and delta RPM rebuild speed measured in previous runs.
+
+    Stores to cachedir.
+
+    """
+
+    # bump when the format of the stored statistics changes
+    _VERSION = 1
+
+    def __init__(self, cachedir):
+        self.db_path = os.path.join(cachedir, "drpm_stats.json")
+
+    def load(self):
+        """Return (bandwidth, rebuild_rate) in bytes per second, None if unknown."""
+        stats = self._load_keyed(
+            self._VERSION, _("Failed to load delta RPM statistics: %s"))
+        if not isinstance(stats, dict):
+            return None, None
+        return stats.get('bandwidth'), stats.get('rebuild_rate')
+
+    def save(self, bandwidth, rebuild_rate):
+        return self._save_keyed(
+            self._VERSION, {'bandwidth': bandwidth, 'rebuild_rate': rebuild_rate},
+            _("Failed to store delta RPM statistics: %s"))
+
 
 class RepoPersistor(JSONDB):
     """Persistent data kept for repositories.
@@ -113,6 +163,51 @@ class RepoPersistor(JSONDB):
             return None
 
 
+class RpmdbCookiePersistor(object):
+    """Cookie of the rpmdb the @System solv cache was built from.
+
+    Stores to cachedir.
+
+    """
+
+    def __init__(self, cachedir):
+        self.cookie_path = os.path.join(cachedir, "@System.cookie")
+
+    def get_cookie(self):
+        try:
+            with open(self.cookie_path, 'r') as f:
+                return f.read().strip()
+        except (IOError, OSError):
+            return None
+
+    def save(self, cookie):
+        try:
+            dnf.util.ensure_dir(os.path.dirname(self.cookie_path))
+            with open(self.cookie_path, 'w') as f:
+                f.write(cookie or '')
+        except (IOError, OSError) as e:
+            logger.warning(_("Failed to store rpmdb cookie: %s"), e)
+            return False
+        return True
+
+
+class SackSnapshotPersistor(JSONDB):
+    """Snapshot of the excludes and includes evaluated for a filled sack.
+
+    Stores to cachedir. The snapshot is only returned for the key it was saved with.
+
+    """
+
+    def __init__(self, cachedir):
+        self.db_path = os.path.join(cachedir, "sack_snapshot.json")
+
+    def load(self, key):
+        return self._load_keyed(key, _("Failed to load sack snapshot: %s"))
+
+    def save(self, key, data):
+        return self._save_keyed(key, data, _("Failed to store sack snapshot: %s"))
+
+
 class TempfilePersistor(JSONDB):
 
     def __init__(self, cachedir):
@@ -35,6 +35,7 @@ import dnf.util
 import dnf.yum.misc
 import libdnf.error
 import libdnf.repo
+import concurrent.futures
 import functools
 import hashlib
 import hawkey
@@ -45,6 +46,7 @@ import re
 import shutil
 import string
 import sys
+import threading
 import time
 import traceback
 import urllib
@@ -64,11 +66,15 @@ CACHE_FILES = {
     'metadata': r'^%s\/.*((xml|yaml)(\.gz|\.xz|\.bz2|\.zck|\.zst)?|asc|cachecookie|%s)$' %
                 (_CACHEDIR_RE, _MIRRORLIST_FILENAME),
     'packages': r'^%s\/%s\/.+rpm$' % (_CACHEDIR_RE, _PACKAGES_RELATIVE_DIR),
-    'dbcache': r'^.+(solv|solvx)$',
+    'dbcache': r'^(.+(solv|solvx)|sack_snapshot\.json)$',
 }
 
 logger = logging.getLogger("dnf")
 
+# Serializes repo callbacks (progress reporting, key import prompts) when metadata of several
+# repositories are loaded in parallel.
+_REPO_CALLBACKS_LOCK = threading.RLock()
+
 
 def repo_id_invalid(repo_id):
     # :api
@@ -85,12 +91,14 @@ def _pkg2payload(pkg, progress, *factories):
     raise ValueError(_('no matching payload factory for %s') % pkg)
 
 
-def _download_payloads(payloads, drpm, fail_fast=True):
+def _download_payloads(payloads, drpm, fail_fast=True, pipeline=None):
     # download packages
     def _download_sort_key(payload):
         return not hasattr(payload, 'delta')
 
     drpm.err.clear()
+    for pload in payloads:
+        pload._pipeline = pipeline
     targets = [pload._librepo_target()
                for pload in sorted(payloads, key=_download_sort_key)]
     errs = _DownloadErrors()
@@ -158,6 +166,41 @@ class _DownloadErrors(object):
         return pload.download_size
 
 
+class _PackagePipeline(object):
+    """Process downloaded packages in a pool of threads while the remaining
+    downloads are still in flight.
+
+    `process` is called with every package submitted as soon as its file is
+    complete, the results are collected by wait().
+    """
+
+    def __init__(self, process, max_workers=None):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self._process = process
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = {}
+
+    def submit(self, pkg):
+        if pkg not in self._futures:
+            self._futures[pkg] = self._executor.submit(self._process, pkg)
+
+    def wait(self):
+        """Wait for all the submitted packages and return {pkg: result}.
+
+        Packages whose processing failed are left out, the serial code path
+        handles them and reports the errors.
+        """
+        self._executor.shutdown(wait=True)
+        results = {}
+        for pkg, future in self._futures.items():
+            try:
+                results[pkg] = future.result()
+            except Exception as e:
+                logger.debug('Processing of downloaded package %s failed: %s', pkg, e)
+        return results
+
+
 class _DetailedLibrepoError(Exception):
     def __init__(self, librepo_err, source_url):
         Exception.__init__(self)
@@ -204,6 +247,7 @@ class PackagePayload(dnf.callback.Payload):
         super(PackagePayload, self).__init__(progress)
         self.callbacks = PackageTargetCallbacks(self)
         self.pkg = pkg
+        self._pipeline = None
 
     def _end_cb(self, cbdata, lr_status, msg):
         """End callback to librepo operation."""
@@ -216,6 +260,13 @@ class PackagePayload(dnf.callback.Payload):
             status = dnf.callback.STATUS_ALREADY_EXISTS
 
         self.progress.end(self, status, msg)
+        if status in (dnf.callback.STATUS_OK, dnf.callback.STATUS_ALREADY_EXISTS):
+            self._complete()
+
+    def _complete(self):
+        """The package file is complete, hand it over to the pipeline."""
+        if self._pipeline is not None:
+            self._pipeline.submit(self.pkg)
 
     def _mirrorfail_cb(self, cbdata, err, url):
         self.progress.end(self, dnf.callback.STATUS_MIRROR, err)
@@ -396,24 +447,30 @@ class RepoCallbacks(libdnf.repo.RepoCB):
         self._md_pload = repo._md_pload
 
     def start(self, what):
-        self._md_pload.start(what)
+        with _REPO_CALLBACKS_LOCK:
+            self._md_pload.start(what)
 
     def end(self):
-        self._md_pload.end()
+        with _REPO_CALLBACKS_LOCK:
+            self._md_pload.end()
 
     def progress(self, totalToDownload, downloaded):
-        self._md_pload._progress_cb(None, totalToDownload, downloaded)
+        with _REPO_CALLBACKS_LOCK:
+            self._md_pload._progress_cb(None, totalToDownload, downloaded)
         return 0
 
     def fastestMirror(self, stage, ptr):
-        self._md_pload._fastestmirror_cb(None, stage, ptr)
+        with _REPO_CALLBACKS_LOCK:
+            self._md_pload._fastestmirror_cb(None, stage, ptr)
 
     def handleMirrorFailure(self, msg, url, metadata):
-        self._md_pload._mirror_failure_cb(None, msg, url, metadata)
+        with _REPO_CALLBACKS_LOCK:
+            self._md_pload._mirror_failure_cb(None, msg, url, metadata)
         return 0
 
     def repokeyImport(self, id, userid, fingerprint, url, timestamp):
-        return self._repo._key_import._confirm(id, userid, fingerprint, url, timestamp)
+        with _REPO_CALLBACKS_LOCK:
+            return self._repo._key_import._confirm(id, userid, fingerprint, url, timestamp)
 
 
 class Repo(dnf.conf.RepoConf):
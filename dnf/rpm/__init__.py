@@ -70,9 +70,10 @@ def detect_releasever(installroot):
     return None
 
 
-def _header(path):
-    """Return RPM header of the file."""
-    ts = transaction.initReadOnlyTransaction()
+def _header(path, ts=None):
+    """Return RPM header of the file, read with `ts` if given."""
+    if ts is None:
+        ts = transaction.initReadOnlyTransaction()
     with open(path) as package:
         fdno = package.fileno()
         try:
@@ -15,6 +15,7 @@
 
 from __future__ import print_function, absolute_import, unicode_literals
 
+import concurrent.futures
 import os
 import subprocess
 import logging
@@ -107,3 +108,16 @@ def checkSig(ts, package):
     finally:
         os.close(fdno)
     return value
+
+def checkSigs(ts, packages, max_workers=None):
+    """Check the sigs of the packages like checkSig() does, running up to
+    max_workers rpmkeys processes at a time. Return the list of the results
+    in the order of the packages."""
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(packages))
+    if max_workers <= 1:
+        return [checkSig(ts, package) for package in packages]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda package: checkSig(ts, package), packages))
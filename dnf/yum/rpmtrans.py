@@ -26,8 +26,9 @@ import dnf.util
 import rpm
 import os
 import logging
+import select
 import sys
-import tempfile
+import threading
 import traceback
 import warnings
 
@@ -164,6 +165,71 @@ class LoggingTransactionDisplay(TransactionDisplay):
             self.rpm_logger.info(ucd(msgs))
 
 
+class _OutputReader(object):
+    """Collect the output of rpm and of the scriptlets from a pipe.
+
+    A thread keeps emptying the pipe so that a chatty scriptlet never blocks
+    on it. drain() returns everything written into the pipe so far, it reads
+    the rest of the pipe itself so that the output is attributed to the
+    callback it belongs to.
+    """
+
+    def __init__(self):
+        self._rfd, wfd = os.pipe()
+        os.set_blocking(self._rfd, False)
+        self.writepipe = os.fdopen(wfd, 'wb')
+        self._wake_r, self._wake_w = os.pipe()
+        self._chunks = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='rpm-output', daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        """Read what is available in the pipe, return False at its end.
+
+        Called with the lock held.
+        """
+        if self._rfd is None:
+            return False
+        while True:
+            try:
+                data = os.read(self._rfd, 65536)
+            except BlockingIOError:
+                return True
+            if not data:
+                return False
+            self._chunks.append(data)
+
+    def _run(self):
+        while True:
+            readable = select.select([self._rfd, self._wake_r], [], [])[0]
+            if self._wake_r in readable:
+                return
+            with self._lock:
+                if not self._read():
+                    return
+
+    def drain(self):
+        with self._lock:
+            self._read()
+            out = b''.join(self._chunks)
+            self._chunks = []
+        return out or None
+
+    def close(self):
+        if self._rfd is None:
+            return
+        os.write(self._wake_w, b'\0')
+        self._thread.join()
+        with self._lock:
+            # keep the rest of the output for drain()
+            self._read()
+            os.close(self._rfd)
+            self._rfd = None
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+
+
 class RPMTransaction(object):
     def __init__(self, base, test=False, displays=()):
         if not displays:
@@ -184,13 +250,13 @@ class RPMTransaction(object):
         # Index in _te_list of the transaction element being processed (for use
         # in callbacks)
         self._te_index = 0
-        self._tsi_cache = None
+        # NEVRA of the transaction items -> the items, built in _transStart()
+        self._tsi_index = None
 
     def _setupOutputLogging(self, rpmverbosity="info"):
-        # UGLY... set up the transaction to record output from scriptlets
-        io_r = tempfile.NamedTemporaryFile()
-        self._readpipe = io_r
-        self._writepipe = open(io_r.name, 'w+b')
+        # set up the transaction to record output from scriptlets
+        self._output_reader = _OutputReader()
+        self._writepipe = self._output_reader.writepipe
         self.base._ts.setScriptFd(self._writepipe)
         rpmverbosity = {'critical' : 'crit',
                         'emergency' : 'emerg',
@@ -209,24 +275,12 @@ class RPMTransaction(object):
         rpm.setLogFile(sys.stderr)
         try:
             self._writepipe.close()
+            self._output_reader.close()
         except:
             pass
 
     def _scriptOutput(self):
-        try:
-            # XXX ugly workaround of problem which started after upgrading glibc
-            # from glibc-2.27-32.fc28.x86_64 to glibc-2.28-9.fc29.x86_64
-            # After this upgrade nothing is read from _readpipe, so every
-            # posttrans and postun scriptlet output is lost. The problem
-            # only occurs when using dnf-2, dnf-3 is OK.
-            # I did not find the root cause of this error yet.
-            self._readpipe.seek(self._readpipe.tell())
-            out = self._readpipe.read()
-            if not out:
-                return None
-            return out
-        except IOError:
-            pass
+        return self._output_reader.drain()
 
     def messages(self):
         messages = self._scriptOutput()
@@ -252,20 +306,20 @@ class RPMTransaction(object):
 
         te = self._te_list[self._te_index]
         te_nevra = dnf.util._te_nevra(te)
-        if self._tsi_cache:
-            if str(self._tsi_cache[0]) == te_nevra:
-                return self._tsi_cache
-        items = []
+        if self._tsi_index is None:
+            self._index_transaction()
+        items = self._tsi_index.get(te_nevra)
+        if items:
+            return items
+        raise RuntimeError("TransactionItem not found for key: %s" % cbkey)
+
+    def _index_transaction(self):
+        self._tsi_index = {}
         for tsi in self.base.transaction:
             if tsi.action not in RPM_ACTIONS_SET:
                 # skip REINSTALL in order to return REINSTALLED, or REASON_CHANGE to avoid crash
                 continue
-            if str(tsi) == te_nevra:
-                items.append(tsi)
-        if items:
-            self._tsi_cache = items
-            return items
-        raise RuntimeError("TransactionItem not found for key: %s" % cbkey)
+            self._tsi_index.setdefault(str(tsi), []).append(tsi)
 
     def callback(self, what, amount, total, key, client_data):
         try:
@@ -318,6 +372,7 @@ class RPMTransaction(object):
         if self.test: return
         self.trans_running = True
         self._te_list = list(self.base._ts)
+        self._index_transaction()
 
     def _trans_progress(self, amount, total):
         action = dnf.transaction.TRANS_PREPARATION
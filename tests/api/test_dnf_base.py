@@ -192,6 +192,11 @@ class DnfBaseApiTest(TestCase):
         self.assertHasAttr(self.base, "package_signature_check")
         self.base.package_signature_check(pkg=self._get_pkg())
 
+    def test_packages_signature_check(self):
+        # Base.packages_signature_check(self, pkgs)
+        self.assertHasAttr(self.base, "packages_signature_check")
+        self.base.packages_signature_check(pkgs=[self._get_pkg()])
+
     def test_package_import_key(self):
         # Base.package_import_key(self, pkg, askcb=None, fullaskcb=None)
         self.assertHasAttr(self.base, "package_import_key")
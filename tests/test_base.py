@@ -102,6 +102,45 @@ class BaseTest(tests.support.TestCase):
         ts.close.assert_called_once_with()
         base.close()
 
+    @mock.patch('dnf.rpm.transaction.initReadOnlyTransaction', mock.Mock())
+    @mock.patch('dnf.rpm.miscutils.checkSigs', return_value=[0, 4])
+    def test_sig_check_pkgs(self, checkSigs):
+        base = tests.support.MockBase('main')
+        base.repos['main'].gpgcheck = True
+        pkgs = base.sack.query().available().filter(reponame='main').run()[:2]
+        results = base._sig_check_pkgs(pkgs)
+        checkSigs.assert_called_once_with(mock.ANY, [pkg.localPkg() for pkg in pkgs])
+        self.assertEqual(results[0], (0, ''))
+        self.assertEqual(results[1][0], 2)
+        base.close()
+
+    @mock.patch('dnf.rpm.transaction.initReadOnlyTransaction', mock.Mock())
+    @mock.patch('dnf.rpm.miscutils.checkSigs', return_value=[4])
+    def test_sig_check_pkgs_pipeline(self, checkSigs):
+        base = tests.support.MockBase('main')
+        base.repos['main'].gpgcheck = True
+        pkgs = base.sack.query().available().filter(reponame='main').run()[:2]
+        base._pipeline_sigresults[pkgs[0]] = 0
+        results = base._sig_check_pkgs(pkgs)
+        checkSigs.assert_called_once_with(mock.ANY, [pkgs[1].localPkg()])
+        self.assertEqual(results[0], (0, ''))
+        self.assertEqual(results[1][0], 2)
+        self.assertEqual(base._pipeline_sigresults, {})
+        base.close()
+
+    @mock.patch('dnf.rpm.transaction.initReadOnlyTransaction', mock.Mock())
+    @mock.patch('dnf.rpm.miscutils.checkSigs', side_effect=lambda ts, paths: [4] * len(paths))
+    def test_package_signature_check_pipeline(self, checkSigs):
+        base = tests.support.MockBase('main')
+        base.repos['main'].gpgcheck = True
+        pkgs = base.sack.query().available().filter(reponame='main').run()[:2]
+        base._pipeline_sigresults[pkgs[0]] = 0
+        self.assertEqual(base.package_signature_check(pkgs[0]), (0, ''))
+        self.assertEqual(base.package_signature_check(pkgs[1])[0], 2)
+        checkSigs.assert_called_with(mock.ANY, [pkgs[1].localPkg()])
+        self.assertEqual(base._pipeline_sigresults, {})
+        base.close()
+
     def test_iter_userinstalled(self):
         """Test iter_userinstalled with a package installed by the user."""
         base = tests.support.MockBase()
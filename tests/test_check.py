@@ -25,6 +25,7 @@ import dnf.cli.commands.check
 import dnf.pycomp
 
 import tests.support
+from tests.support import mock
 
 
 EXPECTED_DUPLICATES_FORMAT = """\
@@ -62,3 +63,33 @@ class CheckDuplicatesTest(tests.support.DnfBaseTestCase):
             self.assertEqual(str(ctx.exception),
                              'Check discovered 1 problem(s)')
         self.assertEqual(stdout.getvalue(), EXPECTED_OBSOLETED_FORMAT)
+
+
+class CheckBulkTest(tests.support.TestCase):
+
+    def setUp(self):
+        self.cmd = dnf.cli.commands.check.CheckCommand(mock.Mock())
+
+    def test_provided_by(self):
+        q = mock.Mock()
+        q.filter.return_value.run.return_value = ['lotus-3-16.x86_64']
+        for _ in range(3):
+            self.assertEqual(self.cmd._provided_by(q, 'lotus'), ['lotus-3-16.x86_64'])
+        q.filter.assert_called_once_with(provides=['lotus'])
+
+    @mock.patch('dnf.selector.Selector')
+    @mock.patch('dnf.sack.rpmdb_sack')
+    @mock.patch('dnf.goal.Goal')
+    def test_rich_deps_single_run(self, goal, _sack, _selector):
+        goal.return_value.run.return_value = True
+        self.assertEqual(self.cmd._rich_deps_unsatisfied(['(a or b)', '(c if d)']), set())
+        self.assertEqual(goal.call_count, 1)
+
+    @mock.patch('dnf.selector.Selector')
+    @mock.patch('dnf.sack.rpmdb_sack')
+    @mock.patch('dnf.goal.Goal')
+    def test_rich_deps_narrowed(self, goal, _sack, _selector):
+        goal.return_value.run.side_effect = [False, True, False]
+        self.assertEqual(self.cmd._rich_deps_unsatisfied(['(a or b)', '(c if d)']),
+                         {'(c if d)'})
+        self.assertEqual(goal.call_count, 3)
@@ -169,6 +169,18 @@ class CliTest(tests.support.DnfBaseTestCase):
         self.assertEqual(self.base.repos['one']._repo.getSyncStrategy(),
                          dnf.repo.SYNC_ONLY_CACHE)
 
+    def test_process_demands_available_repo_ids(self, _):
+        self.base._repos = dnf.repodict.RepoDict()
+        for repoid in ('one', 'two'):
+            repo = tests.support.MockRepo(repoid, self.base.conf)
+            repo.enable()
+            self.base._repos.add(repo)
+        self.cli.demands.available_repos = True
+        self.cli.demands.available_repo_ids = ['two']
+        self.cli._process_demands()
+        self.assertFalse(self.base.repos['one'].enabled)
+        self.assertTrue(self.base.repos['two'].enabled)
+
 
 @mock.patch('dnf.logging.Logging._setup', new=mock.MagicMock)
 class ConfigureTest(tests.support.DnfBaseTestCase):
@@ -104,6 +104,13 @@ class CompsTest(tests.support.TestCase):
         self.assertCountEqual(map(operator.attrgetter('name'), g.packages_iter()),
                               ('tour', 'pepper'))
 
+    def test_group_ids_by_package_name(self):
+        group_ids = self.comps._group_ids_by_package_name()
+        self.assertEqual(group_ids['pepper'], {'base', 'somerset'})
+        self.assertEqual(group_ids['meaning-of-life'], {'broken-group', 'missing-name-group'})
+        self.assertNotIn('mrkite', group_ids)
+        self.assertIs(self.comps._group_ids_by_package_name(), group_ids)
+
     def test_iteration(self):
         comps = self.comps
         self.assertEqual([g.name for g in comps.groups_iter()],
@@ -145,3 +145,24 @@ class ConfTest(tests.support.TestCase):
         conf = Conf()
         with self.assertRaises(dnf.exceptions.ConfigError):
             conf.debuglevel = '11'
+
+    def test_max_parallel_metadata(self):
+        conf = Conf()
+        self.assertEqual(conf.max_parallel_metadata, 1)
+        opts = argparse.Namespace(main_setopts={'max_parallel_metadata': ['4']})
+        conf._configure_from_options(opts)
+        self.assertEqual(conf.max_parallel_metadata, 4)
+        with self.assertRaises(dnf.exceptions.ConfigError):
+            conf.max_parallel_metadata = '0'
+        with self.assertRaises(dnf.exceptions.ConfigError):
+            conf.max_parallel_metadata = 'many'
+        self.assertEqual(conf.max_parallel_metadata, 4)
+
+    def test_download_pipeline(self):
+        conf = Conf()
+        self.assertFalse(conf.download_pipeline)
+        opts = argparse.Namespace(main_setopts={'download_pipeline': ['yes']})
+        conf._configure_from_options(opts)
+        self.assertTrue(conf.download_pipeline)
+        conf.download_pipeline = False
+        self.assertFalse(conf.download_pipeline)
@@ -17,7 +17,10 @@
 # Red Hat, Inc.
 #
 
+import tempfile
+
 import dnf.dnssec
+import dnf.util
 
 import tests.support
 
@@ -92,3 +95,35 @@ class KeyInfoTest(tests.support.TestCase):
     def test_key_info_from_rpm_key_object_key_part(self):
         key_info = dnf.dnssec.KeyInfo.from_rpm_key_object(RPM_USER, RPM_RAW_KEY)
         self.assertEqual(key_info.key, ASCII_RAW_KEY)
+
+
+class DNSSECKeyVerificationCacheTest(tests.support.TestCase):
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(prefix="dnf-dnssec-test-")
+        self._cache = dnf.dnssec.DNSSECKeyVerification._cache
+        self._cache_expires = dnf.dnssec.DNSSECKeyVerification._cache_expires
+        dnf.dnssec.DNSSECKeyVerification._cache = {}
+        dnf.dnssec.DNSSECKeyVerification._cache_expires = {}
+
+    def tearDown(self):
+        dnf.dnssec.DNSSECKeyVerification._cache = self._cache
+        dnf.dnssec.DNSSECKeyVerification._cache_expires = self._cache_expires
+        dnf.util.rm_rf(self.cachedir)
+
+    def test_persistent_cache(self):
+        key_info = dnf.dnssec.KeyInfo(EMAIL, ASCII_RAW_KEY)
+        nokey_info = dnf.dnssec.KeyInfo('nokey@example.com', ASCII_RAW_KEY)
+        expired_info = dnf.dnssec.KeyInfo('expired@example.com', ASCII_RAW_KEY)
+        verification = dnf.dnssec.DNSSECKeyVerification
+        verification._store(key_info, dnf.dnssec.Validity.VALID, 3600)
+        verification._store(nokey_info, dnf.dnssec.Validity.PROVEN_NONEXISTENCE, 3600)
+        verification._store(expired_info, dnf.dnssec.Validity.VALID, -1)
+        verification.save_cache(self.cachedir)
+
+        verification._cache = {}
+        verification._cache_expires = {}
+        verification.load_cache(self.cachedir)
+        self.assertEqual(verification.verify_all([key_info, nokey_info]),
+                         [dnf.dnssec.Validity.VALID, dnf.dnssec.Validity.PROVEN_NONEXISTENCE])
+        self.assertNotIn(expired_info.email, verification._cache)
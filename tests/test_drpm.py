@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (C) 2026 Red Hat, Inc.
+#
+# This copyrighted material is made available to anyone wishing to use,
+# modify, copy, or redistribute it subject to the terms and conditions of
+# the GNU General Public License v.2, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY expressed or implied, including the implied warranties of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General
+# Public License for more details.  You should have received a copy of the
+# GNU General Public License along with this program; if not, write to the
+# Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
+# 02110-1301, USA.  Any Red Hat trademarks that are incorporated in the
+# source code or documentation are not subject to the GNU General Public
+# License and may only be used or replicated with the express permission of
+# Red Hat, Inc.
+#
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import dnf.drpm
+
+import tests.support
+from tests.support import mock
+
+
+def _payload(name, size):
+    pload = mock.Mock(download_size=size // 10, _full_size=size, _pipeline=None)
+    pload.pkg = mock.Mock(_size=size, downloadsize=size)
+    pload.pkg.__str__ = mock.Mock(return_value=name)
+    return pload
+
+
+class DeltaInfoTest(tests.support.TestCase):
+
+    def setUp(self):
+        self.delta_info = dnf.drpm.DeltaInfo(None, mock.Mock(), 75, 1)
+        self.started = []
+        self.delta_info.start_job = self._start_job
+
+    def _start_job(self, pload):
+        self.started.append(pload)
+        self.delta_info.jobs[len(self.started)] = pload
+        self.delta_info._job_start[len(self.started)] = 0
+
+    @mock.patch('os.waitpid', return_value=(0, 0))
+    def test_largest_first(self, _waitpid):
+        small, large, medium = _payload('small', 10), _payload('large', 1000), \
+            _payload('medium', 100)
+        for pload in (small, large, medium):
+            self.delta_info.enqueue(pload)
+        # the first one started at once, the rest waits for a free slot
+        self.assertEqual(self.started, [small])
+        self.delta_info.jobs.clear()
+        self.delta_info._reap()
+        self.assertEqual(self.started, [small, large])
+        self.delta_info.jobs.clear()
+        self.delta_info._reap()
+        self.assertEqual(self.started, [small, large, medium])
+
+    @mock.patch('os.waitpid', return_value=(0, 0))
+    def test_wait(self, waitpid):
+        small, large = _payload('small', 10), _payload('large', 1000)
+        for pload in (small, large):
+            self.delta_info.enqueue(pload)
+        waitpid.reset_mock()
+        self.delta_info.job_done = lambda pid, code: self.delta_info.jobs.pop(pid)
+        waitpid.side_effect = [(1, 0), (2, 0)]
+        self.delta_info.wait()
+        self.assertEqual(self.started, [small, large])
+        self.assertEqual(self.delta_info.jobs, {})
+        self.assertEqual(waitpid.call_args_list, [mock.call(1, 0), mock.call(2, 0)])
+
+    @mock.patch('dnf.drpm.unlink_f')
+    def test_fallback_to_full_download(self, unlink_f):
+        # rebuilds run at 10 B/s while the network delivers much more
+        self.delta_info._rebuilt_size = 100
+        self.delta_info._rebuild_time = 10.0
+        self.delta_info._begin -= 1
+        pload = _payload('slow', 1000)
+        self.delta_info.enqueue(pload)
+        self.assertEqual(self.started, [])
+        self.assertIn(pload.pkg, self.delta_info.err)
+        unlink_f.assert_called_once_with(pload.localPkg())
+
+
+class CpuBudgetTest(tests.support.TestCase):
+
+    @mock.patch('dnf.drpm._cgroup_cpu_quota', return_value=1.5)
+    @mock.patch('os.sched_getaffinity', return_value=set(range(8)))
+    def test_cgroup_quota(self, _affinity, _quota):
+        self.assertEqual(dnf.drpm._cpu_budget(), 2)
+
+    @mock.patch('dnf.drpm._cgroup_cpu_quota', return_value=None)
+    @mock.patch('os.sched_getaffinity', return_value=set(range(3)))
+    def test_affinity(self, _affinity, _quota):
+        self.assertEqual(dnf.drpm._cpu_budget(), 3)
+
+
+class CostModelTest(tests.support.TestCase):
+
+    def setUp(self):
+        self.installed = mock.Mock(evr='1-1')
+        self.installed.name, self.installed.arch = 'pepper', 'x86_64'
+        self.pkg = mock.Mock(_size=1000, downloadsize=1000, arch='x86_64')
+        self.pkg.name = 'pepper'
+        self.pkg._is_local_pkg.return_value = False
+        self.pkg.localPkg.return_value = '/nonexistent/pepper.rpm'
+        self.pkg.get_delta_from_evr.return_value = mock.Mock(downloadsize=900)
+
+    def _delta_factory(self, cost_model):
+        delta_info = dnf.drpm.DeltaInfo([self.installed], mock.Mock(), 75, 1, cost_model)
+        delta_info.deltarpm_installed = True
+        return delta_info.delta_factory(self.pkg, mock.Mock())
+
+    def test_percentage_without_measurements(self):
+        self.assertIsNone(self._delta_factory(None))
+        self.pkg.get_delta_from_evr.assert_called_once_with('1-1')
+
+    def test_slow_link(self):
+        # 10 B/s download, 1000 B/s rebuild: 90s + 1s beats 100s
+        payload = self._delta_factory(dnf.drpm.DeltaCostModel(10, 1000))
+        self.assertIsInstance(payload, dnf.drpm.DeltaPayload)
+
+    def test_fast_link(self):
+        self.pkg.get_delta_from_evr.return_value = mock.Mock(downloadsize=100)
+        self.assertIsNone(self._delta_factory(dnf.drpm.DeltaCostModel(10000, 100)))
+
+    def test_update(self):
+        cost_model = dnf.drpm.DeltaCostModel(100, None)
+        cost_model.update(200, 50)
+        self.assertEqual(cost_model.bandwidth, 150)
+        self.assertEqual(cost_model.rebuild_rate, 50)
@@ -20,8 +20,14 @@
 from __future__ import absolute_import
 from __future__ import unicode_literals
 
+import os
+import shutil
+import sqlite3
+import tempfile
+
 import libdnf.transaction
 
+import dnf.db.history
 import dnf.history
 
 import tests.support
@@ -503,3 +509,166 @@ class TransactionConverterTest(tests.support.TestCase):
             yield (item.op_type, item.installed, item.erased, item.obsoleted,
                    item.reason)
 '''
+
+
+class SwdbInterfaceBulkTest(tests.support.TestCase):
+
+    def setUp(self):
+        self.installed = {('pepper', 'x86_64'), ('hole', 'x86_64'), ('tour', 'x86_64')}
+        self.history = dnf.db.history.SwdbInterface(
+            None, installed_keys=lambda: self.installed)
+        self.history._swdb = mock.Mock()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'history.sqlite')
+        self.history._swdb.getPath.return_value = path
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE trans (id INTEGER PRIMARY KEY, state INTEGER);
+            CREATE TABLE repo (id INTEGER PRIMARY KEY, repoid TEXT);
+            CREATE TABLE rpm (item_id INTEGER PRIMARY KEY, name TEXT, epoch INTEGER,
+                              version TEXT, release TEXT, arch TEXT);
+            CREATE TABLE trans_item (id INTEGER PRIMARY KEY, trans_id INTEGER,
+                                     item_id INTEGER, repo_id INTEGER, action INTEGER,
+                                     reason INTEGER);
+            INSERT INTO trans VALUES (1, 1), (2, 1);
+            INSERT INTO repo VALUES (1, 'main'), (2, 'updates');
+            INSERT INTO rpm VALUES (1, 'pepper', 0, '20', '0', 'x86_64'),
+                                   (2, 'hole', 0, '1', '1', 'x86_64');
+            CREATE TABLE comps_group_package (id INTEGER PRIMARY KEY, group_id INTEGER,
+                                              name TEXT, installed INTEGER, pkg_type INTEGER);
+            INSERT INTO comps_group_package VALUES (1, 1, 'pepper', 0, 1), (2, 1, 'hole', 0, 1);
+        """)
+        conn.executemany("INSERT INTO trans_item VALUES (?, ?, ?, ?, ?, ?)", [
+            (1, 1, 1, 1, libdnf.transaction.TransactionItemAction_INSTALL,
+             libdnf.transaction.TransactionItemReason_DEPENDENCY),
+            (2, 2, 1, 2, libdnf.transaction.TransactionItemAction_REASON_CHANGE,
+             libdnf.transaction.TransactionItemReason_USER),
+            (3, 1, 2, 1, libdnf.transaction.TransactionItemAction_INSTALL,
+             libdnf.transaction.TransactionItemReason_DEPENDENCY),
+            (4, 2, 2, 1, libdnf.transaction.TransactionItemAction_REMOVE,
+             libdnf.transaction.TransactionItemReason_DEPENDENCY)])
+        conn.commit()
+        conn.close()
+        self.path = path
+
+    def _pkg(self, name, version, release):
+        pkg = mock.Mock(epoch=0, version=version, release=release, arch='x86_64')
+        pkg.name = name
+        return pkg
+
+    def test_reason(self):
+        self.assertEqual(self.history.reason(self._pkg('pepper', '20', '0')),
+                         libdnf.transaction.TransactionItemReason_USER)
+        self.assertEqual(self.history.reason(self._pkg('hole', '1', '1')),
+                         libdnf.transaction.TransactionItemReason_UNKNOWN)
+        self.assertEqual(self.history.reason(self._pkg('tour', '5', '0')),
+                         libdnf.transaction.TransactionItemReason_UNKNOWN)
+        self.history._swdb.resolveRPMTransactionItemReason.assert_not_called()
+
+    def test_repo(self):
+        self.assertEqual(self.history.repo(self._pkg('pepper', '20', '0')), 'updates')
+        self.assertEqual(self.history.repo(self._pkg('pepper', '20', '1')), '')
+        self.history._swdb.getRPMRepo.assert_not_called()
+
+    def test_not_installed(self):
+        self.installed = {('pepper', 'x86_64')}
+        self.history._swdb.resolveRPMTransactionItemReason.return_value = \
+            libdnf.transaction.TransactionItemReason_DEPENDENCY
+        self.history._swdb.getRPMRepo.return_value = 'main'
+        hole = self._pkg('hole', '1', '1')
+        self.assertEqual(self.history.reason(hole),
+                         libdnf.transaction.TransactionItemReason_DEPENDENCY)
+        self.assertEqual(self.history.repo(hole), 'main')
+        self.assertEqual(self.history._reasons, {
+            ('pepper', 'x86_64'): libdnf.transaction.TransactionItemReason_USER})
+
+    def test_sack_not_set_up(self):
+        self.history._installed_keys = lambda: None
+        self.history.reason(self._pkg('pepper', '20', '0'))
+        self.history._swdb.resolveRPMTransactionItemReason.assert_called_once_with(
+            'pepper', 'x86_64', -1)
+
+    def test_set_reason_keeps_maps(self):
+        pepper = self._pkg('pepper', '20', '0')
+        self.history.reason(pepper)
+        reasons = self.history._reasons
+        self.history.set_reason(pepper, libdnf.transaction.TransactionItemReason_DEPENDENCY)
+        self.history.reason(pepper)
+        self.assertIs(self.history._reasons, reasons)
+
+    def test_reason_written_elsewhere(self):
+        pepper = self._pkg('pepper', '20', '0')
+        self.assertEqual(self.history.reason(pepper),
+                         libdnf.transaction.TransactionItemReason_USER)
+        conn = sqlite3.connect(self.path)
+        with conn:
+            conn.execute('UPDATE trans_item SET reason = ? WHERE id = 2',
+                         (libdnf.transaction.TransactionItemReason_DEPENDENCY,))
+        conn.close()
+        # another process wrote to the database later on
+        st = os.stat(self.path)
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.history.reason(pepper),
+                         libdnf.transaction.TransactionItemReason_DEPENDENCY)
+
+    def test_save_group_packages(self):
+        stored = mock.Mock(**{'getId.return_value': 2, 'getInstalled.return_value': True})
+        new = mock.Mock(**{'getId.return_value': 0, 'getInstalled.return_value': True})
+        self.history._save_group_packages([stored, new])
+        stored.save.assert_not_called()
+        new.save.assert_called_once_with()
+        conn = sqlite3.connect(self.path)
+        self.addCleanup(conn.close)
+        self.assertEqual(
+            conn.execute('SELECT name, installed FROM comps_group_package ORDER BY id').fetchall(),
+            [('pepper', 0), ('hole', 1)])
+
+
+class SwdbInterfaceOldTest(tests.support.TestCase):
+
+    def setUp(self):
+        self.history = dnf.db.history.SwdbInterface(None)
+        self.history._swdb = mock.Mock()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.path = os.path.join(tmpdir, 'history.sqlite')
+        open(self.path, 'w').close()
+        self.history._swdb.getPath.return_value = self.path
+        # the rpmdb changed outside of dnf between the transactions 2 and 3
+        versions = [('a', 'b'), ('b', 'c'), ('x', 'y'), ('y', 'z'), ('z', 'w')]
+        self.history._swdb.listTransactions.return_value = [
+            mock.Mock(**{'getId.return_value': tid,
+                         'getRpmdbVersionBegin.return_value': begin,
+                         'getRpmdbVersionEnd.return_value': end})
+            for tid, (begin, end) in enumerate(versions, 1)]
+
+    def _old(self, *args, **kwargs):
+        return [(t.tid, t.altered_lt_rpmdb, t.altered_gt_rpmdb)
+                for t in self.history.old(*args, **kwargs)]
+
+    def test_old(self):
+        self.assertEqual(self._old(), [(5, False, False), (4, False, False),
+                                       (3, True, False), (2, False, True),
+                                       (1, False, False)])
+        self.assertEqual(self._old(['3', 1]), [(3, True, False), (1, False, True)])
+        self.assertEqual(self._old(tid_range=(2, 3)), [(3, True, False), (2, False, True)])
+        self.history._swdb.listTransactions.assert_called_once_with()
+
+    def test_old_pagination(self):
+        self.assertEqual(self._old(limit=2), [(5, False, False), (4, False, False)])
+        self.assertEqual(self._old(limit=2, offset=1), [(4, False, False), (3, True, False)])
+        self.assertEqual(self._old(limit=2, offset=3), [(2, False, True), (1, False, False)])
+        self.assertEqual(self._old(offset=5), [])
+
+    def test_old_written_elsewhere(self):
+        self.assertEqual(len(self._old()), 5)
+        # another process added a transaction
+        self.history._swdb.listTransactions.return_value = (
+            self.history._swdb.listTransactions.return_value + [mock.Mock(**{'getId.return_value': 6,
+                         'getRpmdbVersionBegin.return_value': 'w',
+                         'getRpmdbVersionEnd.return_value': 'v'})])
+        self.assertEqual(len(self._old()), 5)
+        with open(self.path, 'w') as f:
+            f.write('transaction 6')
+        self.assertEqual(self._old(limit=1), [(6, False, False)])
@@ -59,6 +59,18 @@ class MatchCounterTest(tests.support.TestCase):
         self.assertCountEqual(counter.matched_keys(pkg), ['url', 'summary'])
         self.assertCountEqual(counter.matched_haystacks(pkg), [url, summary])
 
+    def test_matched_after_add(self):
+        pkg = PackageStub(summary='poignant bliss')
+        counter = dnf.match_counter.MatchCounter()
+        counter.add(pkg, 'summary', 'bliss')
+        self.assertEqual(counter.matched_needles(pkg), {'bliss'})
+        counter.add(pkg, 'summary', 'poignant')
+        self.assertEqual(counter.matched_needles(pkg), {'bliss', 'poignant'})
+        self.assertEqual(counter.matched_keys(pkg), ['summary'])
+        del counter[pkg]
+        counter.add(pkg, 'url', 'bliss')
+        self.assertEqual(counter.matched_keys(pkg), ['url'])
+
     def test_sorted(self):
         counter = dnf.match_counter.MatchCounter()
         self.assertEqual(counter.sorted(), [])
@@ -21,6 +21,7 @@ from __future__ import absolute_import
 from __future__ import unicode_literals
 
 import binascii
+import dnf.package
 import hawkey
 import rpm
 
@@ -109,6 +110,53 @@ class PackageTest(tests.support.DnfBaseTestCase):
             self.pkg._chksum = (hawkey.CHKSUM_MD5, TOUR_WRONG_MD5)
             self.assertFalse(self.pkg.verifyLocalPkg())
 
+    @mock.patch('dnf.package._verified', {})
+    def test_verify_local_pkgs(self):
+        with mock.patch.object(self.pkg, 'localPkg',
+                               return_value=tests.support.TOUR_44_PKG_PATH):
+            self.pkg._chksum = (hawkey.CHKSUM_SHA256, TOUR_SHA256)
+            dnf.package._verify_local_pkgs([self.pkg])
+            with mock.patch('libdnf.utils.checksum_check') as checksum_check:
+                self.assertTrue(self.pkg.verifyLocalPkg())
+                self.pkg._chksum = (hawkey.CHKSUM_MD5, TOUR_WRONG_MD5)
+                dnf.package._verify_local_pkgs([self.pkg])
+                self.assertFalse(self.pkg.verifyLocalPkg())
+            checksum_check.assert_not_called()
+
+    @mock.patch('dnf.rpm.transaction.initReadOnlyTransaction')
+    @mock.patch('dnf.rpm._header', side_effect=lambda path, ts: 'header of ' + path)
+    def test_read_headers(self, _header, initReadOnlyTransaction):
+        pkgs = [mock.Mock(_priv_header=None, **{'localPkg.return_value': path})
+                for path in ('/a.rpm', '/b.rpm')]
+        pkgs.append(mock.Mock(_priv_header='cached'))
+        dnf.package._read_headers(pkgs)
+        self.assertEqual([pkg._priv_header for pkg in pkgs],
+                         ['header of /a.rpm', 'header of /b.rpm', 'cached'])
+        # a single transaction set reads all the headers
+        ts = initReadOnlyTransaction.return_value
+        self.assertEqual(_header.call_args_list,
+                         [mock.call('/a.rpm', ts), mock.call('/b.rpm', ts)])
+        initReadOnlyTransaction.assert_called_once_with()
+
+    @mock.patch('dnf.rpm.transaction.initReadOnlyTransaction')
+    @mock.patch('dnf.rpm._header', side_effect=lambda path, ts: 'header of ' + path)
+    @mock.patch('dnf.package._file_key', side_effect=lambda path: path)
+    def test_read_headers_kept(self, _file_key, _header, initReadOnlyTransaction):
+        pkgs = [mock.Mock(_priv_header=None, **{'localPkg.return_value': path})
+                for path in ('/a.rpm', '/b.rpm')]
+        with mock.patch.dict(dnf.package._headers, {'/a.rpm': 'kept'}):
+            dnf.package._read_headers(pkgs)
+            self.assertEqual(dnf.package._headers, {})
+        self.assertEqual([pkg._priv_header for pkg in pkgs],
+                         ['kept', 'header of /b.rpm'])
+        _header.assert_called_once_with('/b.rpm', initReadOnlyTransaction.return_value)
+
+    def test_header_cached(self):
+        with mock.patch('dnf.rpm._header', return_value='header') as _header:
+            self.assertEqual(self.pkg._header, 'header')
+            self.assertEqual(self.pkg._header, 'header')
+        _header.assert_called_once_with(self.pkg.localPkg(), None)
+
     def test_return_id_sum(self):
         self.pkg._chksum = (hawkey.CHKSUM_MD5, TOUR_MD5)
         self.assertEqual(self.pkg.returnIdSum(),
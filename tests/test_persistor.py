@@ -32,6 +32,21 @@ import tests.support
 IDS = set(['one', 'two', 'three'])
 
 
+class DeltaRpmStatsPersistorTest(tests.support.TestCase):
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(prefix="dnf-persistor-test-")
+        self.persistor = dnf.persistor.DeltaRpmStatsPersistor(self.cachedir)
+
+    def tearDown(self):
+        dnf.util.rm_rf(self.cachedir)
+
+    def test_stats(self):
+        self.assertEqual(self.persistor.load(), (None, None))
+        self.assertTrue(self.persistor.save(1000.0, None))
+        persistor = dnf.persistor.DeltaRpmStatsPersistor(self.cachedir)
+        self.assertEqual(persistor.load(), (1000.0, None))
+
+
 class RepoPersistorTest(tests.support.TestCase):
     def setUp(self):
         self.persistdir = tempfile.mkdtemp(prefix="dnf-persistor-test-")
@@ -48,3 +63,37 @@ class RepoPersistorTest(tests.support.TestCase):
 
         persistor = dnf.persistor.RepoPersistor(self.persistdir)
         self.assertEqual(persistor.get_expired_repos(), IDS)
+
+
+class RpmdbCookiePersistorTest(tests.support.TestCase):
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(prefix="dnf-persistor-test-")
+
+    def tearDown(self):
+        dnf.util.rm_rf(self.cachedir)
+
+    def test_cookie(self):
+        persistor = dnf.persistor.RpmdbCookiePersistor(self.cachedir)
+        self.assertIsNone(persistor.get_cookie())
+        self.assertTrue(persistor.save('4f3d2a'))
+        persistor = dnf.persistor.RpmdbCookiePersistor(self.cachedir)
+        self.assertEqual(persistor.get_cookie(), '4f3d2a')
+
+
+class SackSnapshotPersistorTest(tests.support.TestCase):
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(prefix="dnf-persistor-test-")
+        self.persistor = dnf.persistor.SackSnapshotPersistor(self.cachedir)
+
+    def tearDown(self):
+        dnf.util.rm_rf(self.cachedir)
+
+    def test_snapshot(self):
+        key = {'rpmdb': 'cookie', 'repos': [['main', 'primary.xml.gz']]}
+        data = {'includes': [], 'excludes': [1, 2, 3]}
+        self.assertIsNone(self.persistor.load(key))
+        self.assertTrue(self.persistor.save(key, data))
+
+        persistor = dnf.persistor.SackSnapshotPersistor(self.cachedir)
+        self.assertEqual(persistor.load(key), data)
+        self.assertIsNone(persistor.load(dict(key, rpmdb='changed')))
@@ -101,6 +101,65 @@ class ArgParseTest(tests.support.TestCase):
         self.assertIsNone(self.cmd.opts.file)
 
 
+class StreamTest(tests.support.TestCase):
+    def test_print_stream(self):
+        with tests.support.patch_std_streams() as (stdout, _):
+            dnf.cli.commands.repoquery.RepoQueryCommand._print_stream(
+                iter(['b', 'a']), '\n\n')
+        self.assertEqual(stdout.getvalue(), 'b\n\na\n')
+
+    def test_print_stream_empty(self):
+        with tests.support.patch_std_streams() as (stdout, _):
+            dnf.cli.commands.repoquery.RepoQueryCommand._print_stream(iter([]))
+        self.assertEqual(stdout.getvalue(), '')
+
+
+class DeplistTest(tests.support.TestCase):
+    def test_providers_resolved_once(self):
+        cmd = dnf.cli.commands.repoquery.RepoQueryCommand(mock.Mock())
+        cmd.opts = mock.Mock(list=None)
+        cmd._providers = mock.Mock(side_effect=lambda req: ['   provider: ' + req + '-1'])
+        pepper = mock.Mock(requires=['lotus', 'hole'])
+        pepper.__str__ = mock.Mock(return_value='pepper')
+        tour = mock.Mock(requires=['lotus'])
+        tour.__str__ = mock.Mock(return_value='tour')
+        self.assertEqual(list(cmd._deplist([pepper, tour])), [
+            'package: pepper\n  dependency: hole\n   provider: hole-1\n'
+            '  dependency: lotus\n   provider: lotus-1',
+            'package: tour\n  dependency: lotus\n   provider: lotus-1'])
+        self.assertEqual(cmd._providers.call_count, 2)
+
+
+class TreeTest(tests.support.TestCase):
+    def setUp(self):
+        self.cmd = dnf.cli.commands.repoquery.RepoQueryCommand(mock.Mock())
+        self.cmd._tree_children = {}
+        self.pkgs = {}
+        for name in ('hole', 'lotus', 'pepper'):
+            self.pkgs[name] = mock.Mock(requires=[])
+            self.pkgs[name].name = name
+        # pepper -> (hole, lotus), lotus -> hole
+        deps = {'pepper': ['hole', 'lotus'], 'lotus': ['hole'], 'hole': []}
+        self.cmd._dependents = mock.Mock(side_effect=lambda names, aquery, types: mock.Mock(
+            run=mock.Mock(return_value=[self.pkgs[n] for n in deps[names[0]]])))
+
+    def _tree(self, depth=None):
+        opts = mock.Mock(packageatr=None, alldeps=False, tree_depth=depth)
+        return self.cmd._build_tree([self.pkgs['pepper']], None, opts)
+
+    def test_build_tree(self):
+        hole, lotus, pepper = self.pkgs['hole'], self.pkgs['lotus'], self.pkgs['pepper']
+        self.assertEqual(self._tree(), [
+            (pepper, [(hole, []), (lotus, [(hole, None)])])])
+        # hole is only looked up once
+        self.assertEqual(self.cmd._dependents.call_count, 3)
+
+    def test_depth(self):
+        hole, lotus, pepper = self.pkgs['hole'], self.pkgs['lotus'], self.pkgs['pepper']
+        self.assertEqual(self._tree(0), [(pepper, None)])
+        self.assertEqual(self._tree(1), [(pepper, [(hole, None), (lotus, None)])])
+
+
 class FilelistFormatTest(tests.support.TestCase):
     def test_filelist(self):
         self.cmd = dnf.cli.commands.repoquery.RepoQueryCommand(
@@ -158,6 +217,44 @@ class OutputTest(tests.support.TestCase):
         self.assertEqual(fmt, "foobar | %{base} | {brackets}")
 
 
+class QueryFormatRendererTest(tests.support.TestCase):
+    def test_render(self):
+        queryformat = "%{name} %-10{version} | %{base} | {brackets} %{name}\\n%{arch}"
+        renderer = dnf.cli.commands.repoquery._QueryFormatRenderer(queryformat)
+        self.assertEqual(renderer.tags, ('arch', 'name', 'version'))
+        pkg = PkgStub()
+        expected = dnf.cli.commands.repoquery.rpm2py_format(queryformat).format(
+            dnf.cli.commands.repoquery.PackageWrapper(pkg))
+        self.assertEqual(renderer.render(pkg), expected)
+        self.assertEqual(renderer.render(pkg),
+                         "foobar      1.0.1 | %{base} | {brackets} foobar\nx86_64")
+
+
+class ReverseDepsTest(tests.support.TestCase):
+    def test_dep_names(self):
+        dep_names = dnf.cli.commands.repoquery._dep_names
+        self.assertEqual(dep_names('perl(Foo::Bar) >= 1.0'), ['perl(Foo::Bar)'])
+        self.assertEqual(dep_names('(pepper if (lotus >= 2 or perl(Foo)))'),
+                         ['pepper'])
+        self.assertEqual(dep_names('(pepper if lotus else (hole or perl(Foo)))'),
+                         ['pepper', 'hole', 'perl(Foo)'])
+        self.assertEqual(dep_names('((lotus >= 2 and pepper) without hole)'),
+                         ['lotus', 'pepper'])
+
+    def test_dependents(self):
+        pepper = mock.Mock(requires=['lotus >= 2'], suggests=[])
+        tour = mock.Mock(requires=['(lotus or hole)'], suggests=['pepper'])
+        query = mock.Mock()
+        query.run.return_value = [pepper, tour]
+        reverse_deps = dnf.cli.commands.repoquery._ReverseDeps(query)
+        self.assertEqual(reverse_deps.dependents(['lotus']), {pepper, tour})
+        self.assertEqual(reverse_deps.dependents(['h*']), {tour})
+        self.assertEqual(reverse_deps.dependents(['pep*'], ('requires', 'suggests')),
+                         {tour})
+        # the packages are read once per dependency type
+        self.assertEqual(query.run.call_count, 2)
+
+
 class Rpm2PyFormatTest(tests.support.TestCase):
     def test_rpm2py_format(self):
         fmt = dnf.cli.commands.repoquery.rpm2py_format('%{name}')
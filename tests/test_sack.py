@@ -82,3 +82,26 @@ class SackTest(tests.support.DnfBaseTestCase):
                           self.base.fill_sack, load_system_repo=False)
         self.assertTrue(r.enabled)
         self.assertTrue(r._check_config_file_age)
+
+    @mock.patch('dnf.sack._build_sack', lambda x: mock.Mock())
+    @mock.patch('dnf.goal.Goal', lambda x: mock.Mock())
+    def test_fill_sack_parallel_metadata(self):
+        def raiser():
+            raise dnf.exceptions.RepoError()
+
+        self.base.conf.max_parallel_metadata = 4
+        added = []
+        bad = tests.support.MockRepo('bad', self.base.conf)
+        bad.load = mock.Mock(side_effect=raiser)
+        bad.skip_if_unavailable = True
+        good = tests.support.MockRepo('good', self.base.conf)
+        good.load = mock.Mock()
+        for r in (good, bad):
+            r.enable()
+            self.base._repos.add(r)
+        with mock.patch.object(self.base, '_add_repo_to_sack', side_effect=added.append):
+            self.base.fill_sack(load_system_repo=False)
+        self.assertEqual(added, [good])
+        self.assertTrue(good.enabled)
+        self.assertFalse(bad.enabled)
+        bad.load.assert_called_once_with()
@@ -26,6 +26,7 @@ import rpm
 import dnf.goal
 import dnf.repo
 import dnf.transaction
+import dnf.yum.rpmtrans
 
 import tests.support
 from tests.support import mock
@@ -255,3 +256,47 @@ class RPMProbFilters(tests.support.DnfBaseTestCase):
         expected = rpm.RPMPROB_FILTER_OLDPACKAGE
         self.base._ts.setProbFilter.assert_called_with(expected)
 '''
+
+
+class RPMTransactionCallbackTest(tests.support.TestCase):
+
+    @staticmethod
+    def _tsi(nevra, action=libdnf.transaction.TransactionItemAction_INSTALL):
+        tsi = mock.Mock(action=action)
+        tsi.__str__ = mock.Mock(return_value=nevra)
+        return tsi
+
+    @staticmethod
+    def _te(name, version):
+        return mock.Mock(**{'N.return_value': name, 'E.return_value': None,
+                            'V.return_value': version, 'R.return_value': '1',
+                            'A.return_value': 'noarch'})
+
+    def test_extract_cbkey(self):
+        base = mock.Mock()
+        reinstall = self._tsi('lotus-3-1.noarch', libdnf.transaction.TransactionItemAction_REINSTALL)
+        reinstalled = self._tsi('lotus-3-1.noarch',
+                                libdnf.transaction.TransactionItemAction_REINSTALLED)
+        pepper = self._tsi('pepper-20-1.noarch')
+        base.transaction = [pepper, reinstall, reinstalled]
+        base._ts = [self._te('pepper', '20'), self._te('lotus', '3')]
+        with mock.patch('dnf.yum.rpmtrans.RPMTransaction._setupOutputLogging'):
+            rpm_trans = dnf.yum.rpmtrans.RPMTransaction(base)
+        rpm_trans._transStart(2)
+        rpm_trans._te_index = 1
+        self.assertEqual(rpm_trans._extract_cbkey('key'), [reinstalled])
+        rpm_trans._te_index = 0
+        self.assertEqual(rpm_trans._extract_cbkey('key'), [pepper])
+
+    def test_output_reader(self):
+        reader = dnf.yum.rpmtrans._OutputReader()
+        self.addCleanup(reader.close)
+        # more than a pipe can hold, it must not block the writer
+        reader.writepipe.write(b'x' * 300000 + b'\n')
+        reader.writepipe.flush()
+        self.assertEqual(len(reader.drain()), 300001)
+        self.assertIsNone(reader.drain())
+        reader.writepipe.write(b'the end\n')
+        reader.writepipe.close()
+        reader.close()
+        self.assertEqual(reader.drain(), b'the end\n')